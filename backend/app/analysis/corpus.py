@@ -0,0 +1,214 @@
+import math
+import re
+import zlib
+import numpy as np
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+STOPWORDS = frozenset(
+    "a an and are as at be been by for from has have how if in into is it its of on or "
+    "over that the their this to was were what when which who will with would "
+    "polymarket prediction market markets".split()
+)
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose
+    return (len(text) + 3) // 4
+
+def tokenize(text: str) -> List[str]:
+    return WORD_RE.findall(text.lower())
+
+class Passage:
+    __slots__ = ("doc", "order", "text", "terms", "tokens", "score")
+
+    def __init__(self, doc: int, order: int, text: str, terms: List[str]):
+        self.doc = doc
+        self.order = order
+        self.text = text
+        self.terms = terms
+        self.tokens = estimate_tokens(text) + 1
+        self.score = 0.0
+
+class Corpus:
+    def __init__(self, text: str, tokens: int, documents: List[Dict[str, Any]], stats: Dict[str, int]):
+        self.text = text
+        self.tokens = tokens
+        self.documents = documents # source documents with at least one passage in `text`
+        self.stats = stats
+
+class CorpusBuilder:
+    """
+    Assembles the LLM corpus from extracted articles and Reddit posts.
+
+    Each document is split into passages of ~CORPUS_PASSAGE_WORDS words and
+    tokenized once. Passages whose MinHash signature (over word 5-shingles)
+    matches an earlier passage above CORPUS_DEDUP_THRESHOLD are dropped, so
+    syndicated copies of a wire story only appear once. The rest are ranked
+    by BM25 against the market question and packed, best first, into the
+    token budget; the output keeps document order so passages read in
+    context.
+    """
+    def __init__(self, token_budget: Optional[int] = None, seed: int = 0):
+        self.token_budget = token_budget or settings.CORPUS_TOKEN_BUDGET
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash family: odd 64-bit multipliers, keep the high 32 bits
+        self._mult = rng.integers(1, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._add = rng.integers(0, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+    def build(
+        self,
+        question: str,
+        news: List[Dict[str, Any]],
+        reddit: List[Dict[str, Any]],
+        token_budget: Optional[int] = None
+    ) -> Corpus:
+        budget = token_budget or self.token_budget
+        documents = [
+            {"kind": "news", "url": n["url"], "title": n.get("title", "News Article"),
+             "header": f"SOURCE: {n['url']}\nCONTENT: ", "text": n.get("raw_content") or ""}
+            for n in news
+        ] + [
+            {"kind": "reddit", "url": r["url"], "title": r["title"],
+             "header": f"REDDIT: {r['title']}\n",
+             "text": "\n\n".join([r.get("selftext") or ""] + [c["body"] for c in r.get("comments", [])])}
+            for r in reddit
+        ]
+
+        passages: List[Passage] = []
+        for i, doc in enumerate(documents):
+            passages.extend(self._split(i, doc["text"][:settings.CORPUS_MAX_DOC_CHARS]))
+            if doc["kind"] == "reddit":
+                # The title is the post; keep it rankable even without a body
+                passages.append(Passage(i, -1, "", tokenize(doc["title"])))
+
+        kept = self._dedupe(passages)
+        self._rank(tokenize(question), kept)
+        selected = self._pack(documents, kept, budget)
+
+        text = self._render(documents, selected)
+        used = sorted({p.doc for p in selected})
+        return Corpus(
+            text=text,
+            tokens=estimate_tokens(text),
+            documents=[documents[i] for i in used],
+            stats={
+                "documents": len(documents),
+                "passages": len(passages),
+                "duplicates": len(passages) - len(kept),
+                "selected": len(selected)
+            }
+        )
+
+    def _split(self, doc: int, text: str) -> List[Passage]:
+        passages = []
+        chunk: List[str] = []
+        terms: List[str] = []
+        for sentence in self._sentences(text):
+            chunk.append(sentence)
+            terms.extend(tokenize(sentence))
+            if len(terms) >= settings.CORPUS_PASSAGE_WORDS:
+                passages.append(Passage(doc, len(passages), " ".join(chunk), terms))
+                chunk, terms = [], []
+        if chunk:
+            passages.append(Passage(doc, len(passages), " ".join(chunk), terms))
+        return passages
+
+    def _sentences(self, text: str):
+        limit = settings.CORPUS_PASSAGE_WORDS
+        for sentence in SENTENCE_RE.split(text):
+            words = sentence.split()
+            # Unpunctuated text (scraped tables, transcripts) is cut into word windows
+            for start in range(0, len(words), limit):
+                yield " ".join(words[start:start + limit])
+
+    def _signatures(self, passages: List[Passage]) -> np.ndarray:
+        sigs = np.full((len(passages), NUM_PERMUTATIONS), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for row, passage in enumerate(passages):
+            terms = passage.terms
+            n = max(len(terms) - SHINGLE_SIZE + 1, 1)
+            shingles = np.fromiter(
+                (zlib.crc32(" ".join(terms[j:j + SHINGLE_SIZE]).encode()) for j in range(n)),
+                dtype=np.uint64,
+                count=n
+            )
+            hashed = (shingles[:, None] * self._mult + self._add) >> np.uint64(32)
+            sigs[row] = hashed.min(axis=0)
+        return sigs
+
+    def _dedupe(self, passages: List[Passage]) -> List[Passage]:
+        if len(passages) < 2:
+            return passages
+        sigs = self._signatures(passages)
+        kept_sigs = np.empty_like(sigs)
+        kept = []
+        # Earlier passages win (news before Reddit, document order)
+        for i, passage in enumerate(passages):
+            if not passage.terms:
+                continue
+            if kept:
+                # Estimated Jaccard similarity: fraction of matching MinHash slots
+                similarity = (kept_sigs[:len(kept)] == sigs[i]).mean(axis=1)
+                if similarity.max() >= settings.CORPUS_DEDUP_THRESHOLD:
+                    continue
+            kept_sigs[len(kept)] = sigs[i]
+            kept.append(passage)
+        return kept
+
+    def _rank(self, query: List[str], passages: List[Passage]):
+        query_terms = [t for t in dict.fromkeys(query) if t not in STOPWORDS]
+        if not passages or not query_terms:
+            return
+        counts = [Counter(p.terms) for p in passages]
+        lengths = np.array([len(p.terms) for p in passages], dtype=np.float64)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1.0))
+
+        n = len(passages)
+        scores = np.zeros(n)
+        for term in query_terms:
+            tf = np.array([c.get(term, 0) for c in counts], dtype=np.float64)
+            df = np.count_nonzero(tf)
+            if df == 0:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        for passage, score in zip(passages, scores):
+            passage.score = float(score)
+
+    def _pack(self, documents: List[Dict[str, Any]], passages: List[Passage], budget: int) -> List[Passage]:
+        # Best first; ties keep source order (news before Reddit, earlier passages first)
+        ranked = sorted(passages, key=lambda p: -p.score)
+        used = 0
+        opened = set()
+        selected = []
+        for passage in ranked:
+            cost = passage.tokens
+            if passage.doc not in opened:
+                cost += estimate_tokens(documents[passage.doc]["header"]) + 1
+            if used + cost > budget:
+                continue
+            used += cost
+            opened.add(passage.doc)
+            selected.append(passage)
+        return selected
+
+    def _render(self, documents: List[Dict[str, Any]], selected: List[Passage]) -> str:
+        by_doc: Dict[int, List[Passage]] = {}
+        for passage in sorted(selected, key=lambda p: (p.doc, p.order)):
+            by_doc.setdefault(passage.doc, []).append(passage)
+
+        parts = []
+        for doc, doc_passages in by_doc.items():
+            body = " ... ".join(p.text for p in doc_passages if p.text)
+            parts.append(f"{documents[doc]['header']}{body}\n\n")
+        return "".join(parts)
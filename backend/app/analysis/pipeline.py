@@ -1,5 +1,7 @@
 import asyncio
-import uuid
+import hashlib
+import json
+import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
@@ -12,90 +14,98 @@ from app.polymarket.gamma import GammaClient
 from app.polymarket.clob import ClobClient
 from app.sources.tavily_client import TavilySource
 from app.sources.reddit_client import RedditSource
-from app.compress.token_company import TokenCompanyClient
+from app.sources.extract_cache import ExtractionCache
+from app.compress.router import CompressionRouter
 from app.llm.gemini_provider import GeminiProvider
+from app.llm.json_stream import IncrementalJSONParser
+from app.config import get_settings
 from app.storage.state import storage
+from app.storage.events import progress_bus
+from app.analysis.scheduler import AnalysisScheduler
+from app.analysis.corpus import CorpusBuilder, estimate_tokens
+
+settings = get_settings()
+
+COMPRESS_TARGET_TOKENS = 4000
 
 class AnalysisPipeline:
-    def __init__(self):
-        self.gamma = GammaClient()
-        self.clob = ClobClient()
+    def __init__(self, gamma: Optional[GammaClient] = None, clob: Optional[ClobClient] = None):
+        self.gamma = gamma or GammaClient()
+        self.clob = clob or ClobClient(self.gamma)
         self.tavily = TavilySource()
+        self.extractor = ExtractionCache(self.tavily)
         self.reddit = RedditSource()
-        self.compressor = TokenCompanyClient()
+        self.compressor = CompressionRouter()
+        self.corpus_builder = CorpusBuilder()
         self.llm = GeminiProvider()
+        self._started: Dict[str, float] = {}
+        self.scheduler = AnalysisScheduler(self._execute_pipeline, on_submit=self._init_state)
 
     async def run_analysis(self, request: AnalysisRequest) -> str:
-        analysis_id = str(uuid.uuid4())
-        
-        # Initialize state
-        storage.set(f"analysis:{analysis_id}", {
-            "analysis_id": analysis_id,
-            "status": "queued",
-            "progress": 0.0
-        })
-        
-        # Start background task
-        asyncio.create_task(self._execute_pipeline(analysis_id, request))
-        
+        # Identical in-flight requests coalesce onto the same analysis id
+        analysis_id, _ = await self.scheduler.submit(request)
         return analysis_id
 
+    async def _init_state(self, analysis_id: str):
+        await self._save_state(analysis_id, status="queued", progress=0.0, stage="queued")
+
     async def _execute_pipeline(self, analysis_id: str, request: AnalysisRequest):
         try:
-            self._update_progress(analysis_id, "processing", 0.1)
+            self._started[analysis_id] = time.monotonic()
+            await self._update_progress(analysis_id, "processing", 0.1, "market_data")
             
             # 1. Fetch Market Data
             market = await self.gamma.get_market(request.market_id)
             if not market:
-                self._update_progress(analysis_id, "failed", 0.0, error="Market not found")
+                await self._update_progress(analysis_id, "failed", 0.0, "failed", error="Market not found")
                 return
                 
-            snapshot = await self.clob.get_market_snapshot(request.market_id)
-            self._update_progress(analysis_id, "processing", 0.2)
+            snapshot = await self.clob.get_market_snapshot(market)
+            await self._update_progress(analysis_id, "processing", 0.2, "search")
             
             # 2. Search & Extract
             query = request.news_query or f"{market.question} Polymarket prediction market"
             
             # Run search and reddit in parallel
             search_task = self.tavily.search(query, max_results=request.max_news_sources)
-            reddit_task = self.reddit.search_submissions(query, limit=request.max_reddit_threads) if request.include_reddit else asyncio.sleep(0, result=[])
+            reddit_task = self.reddit.fetch_threads(query, limit=request.max_reddit_threads) if request.include_reddit else asyncio.sleep(0, result=[])
             
             news_results, reddit_results = await asyncio.gather(search_task, reddit_task)
-            self._update_progress(analysis_id, "processing", 0.4)
+            await self._update_progress(analysis_id, "processing", 0.4, "extract")
             
-            # Extract news content
+            # Extract news content (cached per URL, batched with concurrent analyses)
             news_urls = [r["url"] for r in news_results]
-            news_content = await self.tavily.extract(news_urls)
-            self._update_progress(analysis_id, "processing", 0.6)
+            news_content = await self.extractor.extract(news_urls)
+            await self._update_progress(analysis_id, "processing", 0.6, "compress")
             
             # 3. Build Corpus & Compress
-            corpus = f"Market: {market.question}\nCurrent Price: {snapshot.price}\n\n"
-            citations = []
-            
-            for nc in news_content:
-                corpus += f"SOURCE: {nc['url']}\nCONTENT: {nc.get('raw_content', '')[:2000]}\n\n"
-                citations.append(Citation(
-                    url=nc["url"],
-                    source_type="news",
-                    title=nc.get("title", "News Article"),
-                    extracted_at=datetime.now()
-                ))
-                
-            for rs in reddit_results:
-                corpus += f"REDDIT: {rs['title']}\n{rs['selftext'][:1000]}\n\n"
-                citations.append(Citation(
-                    url=rs["url"],
-                    source_type="reddit",
-                    title=rs["title"],
+            # Dedupe, rank and pack sources into the token budget (CPU-bound, off the event loop)
+            sources = await asyncio.to_thread(self.corpus_builder.build, market.question, news_content, reddit_results)
+            citations = [
+                Citation(
+                    url=doc["url"],
+                    source_type=doc["kind"],
+                    title=doc["title"],
                     extracted_at=datetime.now()
-                ))
+                )
+                for doc in sources.documents
+            ]
                 
-            compressed_corpus = await self.compressor.compress(corpus, target_tokens=4000)
-            self._update_progress(analysis_id, "processing", 0.8)
+            # Identical sources for the same market reuse the stored result
+            cache_key = self._result_cache_key(market.id, sources.text)
+            cached = await self._get_cached_result(cache_key, snapshot.price)
+            if cached:
+                await self._update_progress(analysis_id, "completed", 1.0, "completed", result=cached, cached=True)
+                return
+            
+            corpus = f"Market: {market.question}\nCurrent Price: {snapshot.price}\n\n" + sources.text
+            if estimate_tokens(corpus) > COMPRESS_TARGET_TOKENS:
+                corpus = await self.compressor.compress(corpus, target_tokens=COMPRESS_TARGET_TOKENS, query=market.question)
+            await self._update_progress(analysis_id, "processing", 0.8, "llm")
             
             # 4. LLM Analysis
-            prompt = self._build_analysis_prompt(market.question, compressed_corpus)
-            analysis_json = await self.llm.generate_json(prompt)
+            prompt = self._build_analysis_prompt(market.question, corpus)
+            analysis_json = await self._generate_streaming(analysis_id, prompt)
             
             # 5. Finalize Result
             result = ExplainMoveResult(
@@ -118,26 +128,137 @@ class AnalysisPipeline:
                 citations=citations
             )
             
-            storage.set(f"analysis:{analysis_id}", {
-                "analysis_id": analysis_id,
-                "status": "completed",
-                "progress": 1.0,
-                "result": result.model_dump()
-            })
+            result_json = result.model_dump(mode="json")
+            # A reply that did not parse, or lacks the core sections, is built from placeholders: never cache it
+            if analysis_json.get("headline_summary") and analysis_json.get("narrative"):
+                await storage.set(
+                    cache_key,
+                    {"price": snapshot.price, "result": result_json},
+                    expire=settings.ANALYSIS_CACHE_TTL
+                )
+            await self._update_progress(analysis_id, "completed", 1.0, "completed", result=result_json)
             
         except Exception as e:
             print(f"Pipeline error: {str(e)}")
-            self._update_progress(analysis_id, "failed", 0.0, error=str(e))
+            await self._update_progress(analysis_id, "failed", 0.0, "failed", error=str(e))
+        finally:
+            self._started.pop(analysis_id, None)
 
-    def _update_progress(self, analysis_id: str, status: str, progress: float, error: str = None):
-        current = storage.get(f"analysis:{analysis_id}") or {}
-        current.update({
-            "status": status,
-            "progress": progress
+    async def _generate_streaming(self, analysis_id: str, prompt: str) -> Dict[str, Any]:
+        """
+        Stream the LLM response, publishing `headline_summary` and each driver
+        as a partial result as soon as it is complete.
+        """
+        parser = IncrementalJSONParser()
+        partial: Dict[str, Any] = {}
+        chunks = []
+        async for chunk in self.llm.stream_json(prompt):
+            chunks.append(chunk)
+            updated = False
+            for path, value in parser.feed(chunk):
+                if path == ("headline_summary",):
+                    partial["headline_summary"] = value
+                    updated = True
+                elif len(path) == 2 and path[0] == "drivers" and isinstance(value, dict):
+                    partial.setdefault("drivers", []).append(value)
+                    updated = True
+            if updated:
+                await self._publish_partial(analysis_id, partial)
+
+        try:
+            return json.loads("".join(chunks))
+        except Exception as e:
+            print(f"Failed to parse streamed LLM JSON: {str(e)}")
+            return {}
+
+    async def _publish_partial(self, analysis_id: str, partial: Dict[str, Any]):
+        # Copy: in-process subscribers receive the event object itself
+        partial = {name: list(value) if isinstance(value, list) else value for name, value in partial.items()}
+        await self._save_state(analysis_id, partial=partial)
+        started = self._started.get(analysis_id)
+        await progress_bus.publish(analysis_id, {
+            "analysis_id": analysis_id,
+            "status": "processing",
+            "stage": "llm",
+            "progress": 0.8,
+            "elapsed": round(time.monotonic() - started, 3) if started else 0.0,
+            "partial": partial
         })
+
+    def _result_cache_key(self, market_id: str, sources: str) -> str:
+        digest = hashlib.sha256(sources.encode()).hexdigest()
+        return f"analysis:result:{market_id}:{digest}"
+
+    async def _get_cached_result(self, cache_key: str, price: float) -> Optional[Dict[str, Any]]:
+        cached = await storage.get(cache_key)
+        if not cached:
+            return None
+        # A large price move since the cached run makes its narrative stale
+        if abs(price - cached["price"]) > settings.ANALYSIS_CACHE_PRICE_MOVE:
+            await storage.delete(cache_key)
+            return None
+        return cached["result"]
+
+    async def _update_progress(
+        self,
+        analysis_id: str,
+        status: str,
+        progress: float,
+        stage: str,
+        error: str = None,
+        result: Optional[Dict[str, Any]] = None,
+        cached: Optional[bool] = None
+    ):
+        # A single atomic HSET, no read-modify-write of the whole record
+        await self._save_state(
+            analysis_id, status=status, progress=progress, stage=stage,
+            error=error, result=result, cached=cached
+        )
+
+        # Push the transition to streaming subscribers (SSE/WebSocket), across workers via Redis
+        started = self._started.get(analysis_id)
+        event = {
+            "analysis_id": analysis_id,
+            "status": status,
+            "stage": stage,
+            "progress": progress,
+            "elapsed": round(time.monotonic() - started, 3) if started else 0.0
+        }
         if error:
-            current["error"] = error
-        storage.set(f"analysis:{analysis_id}", current)
+            event["error"] = error
+        if result is not None:
+            event["result"] = result
+            event["cached"] = bool(cached)
+        await progress_bus.publish(analysis_id, event)
+
+    async def _save_state(self, analysis_id: str, **fields: Any):
+        mapping = {"analysis_id": analysis_id}
+        for name, value in fields.items():
+            if value is not None:
+                mapping[name] = json.dumps(value) if name in ("result", "partial") else str(value)
+        await storage.hset(f"analysis:{analysis_id}", mapping)
+
+    async def get_state(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        raw = await storage.hgetall(f"analysis:{analysis_id}")
+        if not raw:
+            return None
+
+        state: Dict[str, Any] = {
+            "analysis_id": raw.get("analysis_id", analysis_id),
+            "status": raw.get("status", "queued"),
+            "progress": float(raw.get("progress", 0.0))
+        }
+        if "result" in raw:
+            state["result"] = json.loads(raw["result"])
+        elif "partial" in raw:
+            state["partial"] = json.loads(raw["partial"])
+        if "error" in raw:
+            state["error"] = raw["error"]
+        if "stage" in raw:
+            state["stage"] = raw["stage"]
+        if raw.get("cached") == "True":
+            state["cached"] = True
+        return state
 
     def _build_analysis_prompt(self, question: str, corpus: str) -> str:
         return f"""
@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from app.config import get_settings
+from app.models import AnalysisRequest
+from app.storage.state import storage
+
+settings = get_settings()
+
+QUEUE_KEY = "analysis:queue"
+
+class SchedulerFullError(Exception):
+    """Raised when the analysis queue is at capacity."""
+
+class AnalysisScheduler:
+    """
+    Bounded priority scheduler for analysis jobs.
+
+    - At most ANALYSIS_MAX_CONCURRENCY pipelines run at once; further jobs
+      wait in a priority queue (lower `priority` runs first, FIFO within a
+      priority) capped at ANALYSIS_QUEUE_MAX.
+    - Identical in-flight requests coalesce onto one analysis id.
+    - Jobs are persisted in Redis (a sorted set of ids plus the request
+      body) until they finish. A per-job claim key stops several workers
+      from resuming the same job; claims are renewed while this process
+      holds the job, so they only lapse once it is gone. The queue is
+      re-scanned on the same timer, so jobs of a crashed worker are picked
+      up within about ANALYSIS_CLAIM_TTL.
+    """
+    def __init__(
+        self,
+        runner: Callable[[str, AnalysisRequest], Awaitable[None]],
+        on_submit: Optional[Callable[[str], Awaitable[None]]] = None
+    ):
+        self.runner = runner
+        self.on_submit = on_submit
+        self.max_concurrency = settings.ANALYSIS_MAX_CONCURRENCY
+        self.max_queue = settings.ANALYSIS_QUEUE_MAX
+        self._queue: "asyncio.PriorityQueue[Tuple[int, int, str]]" = asyncio.PriorityQueue()
+        self._requests: Dict[str, AnalysisRequest] = {}
+        self._keys: Dict[str, str] = {}
+        self._inflight: Dict[str, str] = {}
+        self._workers: List[asyncio.Task] = []
+        self._renewer: Optional[asyncio.Task] = None
+        self._reserved = 0
+        self._seq = itertools.count()
+        self.running = 0
+
+    @staticmethod
+    def dedupe_key(request: AnalysisRequest) -> str:
+        body = request.model_dump(exclude={"priority"})
+        return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+    async def submit(self, request: AnalysisRequest) -> Tuple[str, bool]:
+        """Queue a job; returns (analysis_id, coalesced onto an existing job)."""
+        key = self.dedupe_key(request)
+        existing = self._inflight.get(key)
+        if existing:
+            return existing, True
+
+        if self._queue.qsize() + self._reserved >= self.max_queue:
+            raise SchedulerFullError("Analysis queue is full, retry later")
+
+        # Reserve the key before the first await so concurrent identical submits coalesce onto it
+        analysis_id = str(uuid.uuid4())
+        self._inflight[key] = analysis_id
+        self._reserved += 1
+        try:
+            if self.on_submit:
+                # Runs before the job is visible to workers, so it cannot overwrite their progress
+                await self.on_submit(analysis_id)
+            await storage.set_nx(f"analysis:claim:{analysis_id}", 1, expire=settings.ANALYSIS_CLAIM_TTL)
+            await storage.set(f"analysis:job:{analysis_id}", request.model_dump(), expire=settings.ANALYSIS_JOB_TTL)
+            await storage.zadd(QUEUE_KEY, {analysis_id: self._score(request)}, expire=settings.ANALYSIS_JOB_TTL)
+        except BaseException:
+            if self._inflight.get(key) == analysis_id:
+                del self._inflight[key]
+            raise
+        finally:
+            self._reserved -= 1
+        self._enqueue(analysis_id, request, key)
+        return analysis_id, False
+
+    def _score(self, request: AnalysisRequest) -> float:
+        # Persisted order: priority first, then submission time
+        return request.priority * 1e10 + time.time()
+
+    def _enqueue(self, analysis_id: str, request: AnalysisRequest, key: str):
+        self._requests[analysis_id] = request
+        self._keys[analysis_id] = key
+        self._inflight[key] = analysis_id
+        self._queue.put_nowait((request.priority, next(self._seq), analysis_id))
+
+    async def start(self):
+        await self._resume()
+        for _ in range(self.max_concurrency):
+            self._workers.append(asyncio.create_task(self._worker()))
+        self._renewer = asyncio.create_task(self._maintain())
+
+    async def close(self):
+        workers, self._workers = self._workers, []
+        if self._renewer is not None:
+            workers.append(self._renewer)
+            self._renewer = None
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # Unfinished jobs stay persisted; release their claims so the next start resumes them
+        if self._requests:
+            await storage.delete(*(f"analysis:claim:{analysis_id}" for analysis_id in self._requests))
+
+    async def _resume(self):
+        for analysis_id in await storage.zrange(QUEUE_KEY):
+            if analysis_id in self._requests:
+                continue
+            body = await storage.get(f"analysis:job:{analysis_id}")
+            if not body:
+                await storage.zrem(QUEUE_KEY, analysis_id)
+                continue
+            if not await storage.set_nx(f"analysis:claim:{analysis_id}", 1, expire=settings.ANALYSIS_CLAIM_TTL):
+                # Owned by another live worker
+                continue
+            request = AnalysisRequest(**body)
+            key = self.dedupe_key(request)
+            if key in self._inflight:
+                continue
+            print(f"Resuming analysis job {analysis_id}")
+            self._enqueue(analysis_id, request, key)
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(settings.ANALYSIS_CLAIM_TTL / 3)
+            try:
+                # Jobs can wait in the queue or run for longer than the claim TTL
+                if self._requests:
+                    await storage.expire([f"analysis:claim:{analysis_id}" for analysis_id in self._requests], settings.ANALYSIS_CLAIM_TTL)
+                # Take over jobs whose claims lapsed because their worker died
+                await self._resume()
+            except Exception as e:
+                print(f"Scheduler maintenance error: {str(e)}")
+
+    async def _worker(self):
+        while True:
+            _, _, analysis_id = await self._queue.get()
+            request = self._requests.get(analysis_id)
+            try:
+                if request is None:
+                    continue
+                self.running += 1
+                try:
+                    await self.runner(analysis_id, request)
+                finally:
+                    self.running -= 1
+                await self._finish(analysis_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Scheduler error for {analysis_id}: {str(e)}")
+                await self._finish(analysis_id)
+            finally:
+                self._queue.task_done()
+
+    async def _finish(self, analysis_id: str):
+        self._requests.pop(analysis_id, None)
+        key = self._keys.pop(analysis_id, None)
+        if key and self._inflight.get(key) == analysis_id:
+            del self._inflight[key]
+        await storage.zrem(QUEUE_KEY, analysis_id)
+        await storage.delete(f"analysis:job:{analysis_id}", f"analysis:claim:{analysis_id}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue
+        }
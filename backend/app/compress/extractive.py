@@ -0,0 +1,122 @@
+import re
+import numpy as np
+from scipy import sparse
+from typing import Dict, List, Optional, Tuple
+from app.analysis.corpus import STOPWORDS, estimate_tokens, tokenize
+
+HEADER_RE = re.compile(r"^(Market|Current Price):")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+DAMPING = 0.85
+TEXTRANK_ITERATIONS = 30
+QUERY_WEIGHT = 0.6 # blend of question relevance vs. TextRank centrality
+
+class ExtractiveCompressor:
+    """
+    Local, CPU-only extractive compression.
+
+    Sentences are embedded as TF-IDF vectors; each is scored by a blend of
+    cosine similarity to the market question and TextRank centrality over
+    the sentence similarity graph. The best sentences are kept, in their
+    original order, until `target_tokens` is reached. Header lines
+    (`Market:`, `SOURCE:`, `REDDIT:` ...) are kept for every source that
+    keeps at least one sentence.
+    """
+    def compress(self, text: str, target_tokens: Optional[int] = None, query: Optional[str] = None) -> str:
+        if not target_tokens or estimate_tokens(text) <= target_tokens:
+            return text
+
+        preamble, blocks = self._parse(text)
+        sentences = [(b, s) for b, block in enumerate(blocks) for s in block["sentences"]]
+        if not sentences:
+            return text
+
+        scores = self._score([s for _, s in sentences], query or "")
+        budget = target_tokens - estimate_tokens("\n".join(preamble))
+
+        keep = np.zeros(len(sentences), dtype=bool)
+        opened = set()
+        used = 0
+        for i in np.argsort(-scores, kind="stable"):
+            block, sentence = sentences[i]
+            cost = estimate_tokens(sentence) + 1
+            if block not in opened:
+                cost += estimate_tokens(blocks[block]["header"]) + 1
+            if used + cost > budget:
+                continue
+            used += cost
+            opened.add(block)
+            keep[i] = True
+
+        kept: Dict[int, List[str]] = {}
+        for (block, sentence), k in zip(sentences, keep):
+            if k:
+                kept.setdefault(block, []).append(sentence)
+        out = ["\n".join(preamble)] if preamble else []
+        out += [blocks[b]["header"] + " ".join(kept[b]) for b in sorted(kept)]
+        return "\n\n".join(out) + "\n"
+
+    def _parse(self, text: str) -> Tuple[List[str], List[Dict]]:
+        """Split into leading header lines and one block (header + sentences) per source."""
+        preamble: List[str] = []
+        blocks: List[Dict] = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith(("SOURCE:", "REDDIT:")):
+                blocks.append({"header": line + "\n", "sentences": []})
+                continue
+            if not blocks:
+                if HEADER_RE.match(line):
+                    preamble.append(line)
+                    continue
+                blocks.append({"header": "", "sentences": []})
+            if line.startswith("CONTENT:"):
+                blocks[-1]["header"] += "CONTENT: "
+                line = line[len("CONTENT:"):].strip()
+            blocks[-1]["sentences"].extend(s for s in SENTENCE_RE.split(line) if s)
+        return preamble, blocks
+
+    def _score(self, sentences: List[str], query: str) -> np.ndarray:
+        vocab: Dict[str, int] = {}
+        rows, cols = [], []
+        for i, sentence in enumerate(sentences):
+            for term in tokenize(sentence):
+                if term in STOPWORDS:
+                    continue
+                rows.append(i)
+                cols.append(vocab.setdefault(term, len(vocab)))
+        n = len(sentences)
+        if not vocab:
+            return np.zeros(n)
+
+        tf = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, len(vocab)))
+        tf.sum_duplicates()
+        df = np.bincount(tf.indices, minlength=len(vocab))
+        idf = np.log((1 + n) / (1 + df)) + 1.0
+        tfidf = tf.multiply(idf).tocsr()
+        norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        tfidf = sparse.diags(1.0 / norms) @ tfidf
+
+        # TextRank: PageRank over the cosine-similarity graph
+        sim = (tfidf @ tfidf.T).toarray()
+        np.fill_diagonal(sim, 0.0)
+        out_weight = sim.sum(axis=1)
+        out_weight[out_weight == 0] = 1.0
+        transition = sim / out_weight[:, None]
+        rank = np.full(n, 1.0 / n)
+        for _ in range(TEXTRANK_ITERATIONS):
+            rank = (1 - DAMPING) / n + DAMPING * (transition.T @ rank)
+        rank /= rank.max() or 1.0
+
+        query_terms = [vocab[t] for t in tokenize(query) if t in vocab and t not in STOPWORDS]
+        if not query_terms:
+            return rank
+        query_vec = np.zeros(len(vocab))
+        np.add.at(query_vec, query_terms, idf[query_terms])
+        query_vec /= np.linalg.norm(query_vec)
+        relevance = tfidf @ query_vec
+        relevance /= relevance.max() or 1.0
+        return QUERY_WEIGHT * relevance + (1 - QUERY_WEIGHT) * rank
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from typing import Dict, Optional
+from app.config import get_settings
+from app.compress.extractive import ExtractiveCompressor
+from app.compress.token_company import TokenCompanyClient
+
+settings = get_settings()
+
+EWMA_ALPHA = 0.3
+
+class CompressionRouter:
+    """
+    Chooses between remote (Token Company) and local extractive compression
+    so compression never becomes the long pole of an analysis.
+
+    Cached remote results are always used. Otherwise the remote API is
+    tried while its observed latency (an EWMA of successful calls) fits
+    COMPRESS_LATENCY_BUDGET, with the budget as a hard timeout; slow,
+    failing or unconfigured remote compression falls back to the local
+    compressor. A remote that timed out or failed is skipped until the next
+    COMPRESS_PROBE_INTERVAL, and one judged too slow is re-probed as often.
+    """
+    def __init__(
+        self,
+        remote: Optional[TokenCompanyClient] = None,
+        local: Optional[ExtractiveCompressor] = None,
+        latency_budget: Optional[float] = None
+    ):
+        self.remote = remote or TokenCompanyClient()
+        self.local = local or ExtractiveCompressor()
+        self.latency_budget = latency_budget or settings.COMPRESS_LATENCY_BUDGET
+        self.remote_latency: Optional[float] = None
+        self.local_latency: Optional[float] = None
+        self._last_probe = 0.0
+        self._down_until = 0.0
+        self.counts = {"cached": 0, "remote": 0, "local": 0, "fallback": 0}
+
+    async def compress(self, text: str, target_tokens: Optional[int] = None, query: Optional[str] = None) -> str:
+        if self.remote.available:
+            cached = await self.remote.get_cached(text, target_tokens)
+            if cached is not None:
+                self.counts["cached"] += 1
+                return cached
+            if self._remote_fits_budget():
+                compressed = await self._compress_remote(text, target_tokens)
+                if compressed is not None:
+                    self.counts["remote"] += 1
+                    return compressed
+                self.counts["fallback"] += 1
+        return await self._compress_local(text, target_tokens, query)
+
+    def _remote_fits_budget(self) -> bool:
+        if time.monotonic() < self._down_until:
+            return False
+        if self.remote_latency is None or self.remote_latency <= self.latency_budget:
+            return True
+        return time.monotonic() - self._last_probe >= settings.COMPRESS_PROBE_INTERVAL
+
+    async def _compress_remote(self, text: str, target_tokens: Optional[int]) -> Optional[str]:
+        started = self._last_probe = time.monotonic()
+        try:
+            compressed = await asyncio.wait_for(
+                self.remote.compress_remote(text, target_tokens, timeout=self.latency_budget),
+                timeout=self.latency_budget
+            )
+        except asyncio.TimeoutError:
+            print(f"Token Company compression exceeded {self.latency_budget}s, compressing locally")
+            self._mark_down()
+            return None
+        except Exception as e:
+            print(f"Token Company error: {str(e)}")
+            self._mark_down()
+            return None
+        if compressed is None:
+            # API error response
+            self._mark_down()
+            return None
+        # Only successes are latency samples: timeouts are capped at the budget and errors are fast
+        self.remote_latency = self._observe(self.remote_latency, time.monotonic() - started)
+        return compressed
+
+    def _mark_down(self):
+        self._down_until = time.monotonic() + settings.COMPRESS_PROBE_INTERVAL
+
+    async def _compress_local(self, text: str, target_tokens: Optional[int], query: Optional[str]) -> str:
+        started = time.monotonic()
+        # TF-IDF/TextRank is CPU-bound; keep it off the event loop
+        compressed = await asyncio.to_thread(self.local.compress, text, target_tokens, query)
+        self.local_latency = self._observe(self.local_latency, time.monotonic() - started)
+        self.counts["local"] += 1
+        return compressed
+
+    @staticmethod
+    def _observe(average: Optional[float], sample: float) -> float:
+        return sample if average is None else EWMA_ALPHA * sample + (1 - EWMA_ALPHA) * average
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            **self.counts,
+            "remote_latency": round(self.remote_latency, 4) if self.remote_latency is not None else None,
+            "local_latency": round(self.local_latency, 4) if self.local_latency is not None else None,
+            "latency_budget": self.latency_budget,
+            "remote_down_for": round(max(self._down_until - time.monotonic(), 0.0), 1)
+        }
@@ -1,5 +1,7 @@
+import hashlib
 import httpx
 from app.config import get_settings
+from app.storage.state import storage
 from typing import Optional
 
 settings = get_settings()
@@ -8,34 +10,46 @@ class TokenCompanyClient:
     """
     Client for The Token Company API.
     Used to compress text before sending to LLMs to save tokens and costs.
+    Results are cached by content hash, so re-analysing unchanged sources
+    costs no round trip.
     """
     def __init__(self):
         self.api_key = settings.TOKEN_COMPANY_API_KEY
         self.base_url = "https://api.thetokencompany.com/v1" # Assumed base URL
 
-    async def compress(self, text: str, target_tokens: Optional[int] = None) -> str:
-        if not self.api_key:
-            # Fallback to returning raw text if no API key
-            return text
-            
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def _cache_key(self, text: str, target_tokens: Optional[int]) -> str:
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        return f"compress:{target_tokens or 0}:{digest}"
+
+    async def get_cached(self, text: str, target_tokens: Optional[int] = None) -> Optional[str]:
+        return await storage.get(self._cache_key(text, target_tokens))
+
+    async def compress_remote(self, text: str, target_tokens: Optional[int] = None, timeout: float = 30.0) -> Optional[str]:
+        """Compressed text (cached), or None on an API error; network errors and timeouts raise."""
+        cached = await self.get_cached(text, target_tokens)
+        if cached is not None:
+            return cached
+
         async with httpx.AsyncClient() as client:
-            try:
-                # This is an assumed endpoint based on common patterns
-                resp = await client.post(
-                    f"{self.base_url}/compress",
-                    headers={"Authorization": f"Bearer {self.api_key}"},
-                    json={
-                        "text": text,
-                        "target_tokens": target_tokens
-                    },
-                    timeout=30.0
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    return data.get("compressed_text", text)
-                else:
-                    print(f"Token Company API error: {resp.status_code} {resp.text}")
-                    return text
-            except Exception as e:
-                print(f"Token Company error: {str(e)}")
-                return text
+            # This is an assumed endpoint based on common patterns
+            resp = await client.post(
+                f"{self.base_url}/compress",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json={
+                    "text": text,
+                    "target_tokens": target_tokens
+                },
+                timeout=timeout
+            )
+        if resp.status_code != 200:
+            print(f"Token Company API error: {resp.status_code} {resp.text}")
+            return None
+
+        compressed = resp.json().get("compressed_text")
+        if compressed:
+            await storage.set(self._cache_key(text, target_tokens), compressed, expire=settings.COMPRESS_CACHE_TTL)
+        return compressed
@@ -5,6 +5,120 @@ class Settings(BaseSettings):
     # Polymarket
     POLYMARKET_GAMMA_URL: str = "https://gamma-api.polymarket.com"
     POLYMARKET_CLOB_URL: str = "https://clob.polymarket.com"
+    CLOB_WS_URL: str = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+
+    # Upstream HTTP pools (one per upstream, shared by all clients)
+    HTTP2: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_POOL_TIMEOUT: float = 5.0
+
+    # Background Gamma catalog sync
+    CATALOG_SYNC_ENABLED: bool = True
+    CATALOG_SYNC_INTERVAL: float = 60.0 # seconds between incremental syncs
+    CATALOG_FULL_SYNC_INTERVAL: float = 3600.0
+    CATALOG_MAX_AGE: float = 600.0 # index older than this is bypassed for upstream lookups
+    CATALOG_PAGE_SIZE: int = 500
+    CATALOG_MAX_INCREMENTAL_PAGES: int = 10
+    CATALOG_SNAPSHOT_PATH: str = "data/catalog.json"
+
+    # Market/event metadata cache
+    MARKET_CACHE_SIZE: int = 4096
+    MARKET_CACHE_TTL: float = 60.0
+
+    # Analysis job scheduler
+    ANALYSIS_MAX_CONCURRENCY: int = 4
+    ANALYSIS_QUEUE_MAX: int = 200
+    ANALYSIS_JOB_TTL: int = 86400 # seconds a persisted queued job survives
+    ANALYSIS_CLAIM_TTL: int = 60 # seconds a claim outlives its last renewal (a third of this) before another worker resumes the job
+
+    ANALYSIS_STREAM_KEEPALIVE: float = 15.0 # seconds between SSE keepalive comments
+
+    # Analysis result cache (keyed by market + hash of the assembled sources)
+    ANALYSIS_CACHE_TTL: int = 1800
+    ANALYSIS_CACHE_PRICE_MOVE: float = 0.05 # absolute price move that invalidates a cached result
+
+    # URL extraction cache and cross-job batching
+    EXTRACT_CACHE_TTL: int = 86400
+    EXTRACT_BATCH_SIZE: int = 20 # Tavily extract accepts up to 20 URLs per call
+    EXTRACT_BATCH_WINDOW: float = 0.05 # seconds to gather URLs from concurrent analyses
+
+    # Dedicated thread pools for the blocking SDKs
+    REDDIT_EXECUTOR_WORKERS: int = 4
+    TAVILY_EXECUTOR_WORKERS: int = 8
+    GEMINI_EXECUTOR_WORKERS: int = 8
+    EXECUTOR_QUEUE_TIMEOUT: float = 30.0 # seconds a call may wait for a free worker
+    REDDIT_COMMENT_FANOUT: int = 3 # concurrent comment fetches per analysis
+
+    # Corpus assembly (dedupe, rank and pack sources into the LLM prompt)
+    CORPUS_TOKEN_BUDGET: int = 4000
+    CORPUS_PASSAGE_WORDS: int = 120
+    CORPUS_DEDUP_THRESHOLD: float = 0.7 # estimated Jaccard similarity above which a passage is a duplicate
+    CORPUS_MAX_DOC_CHARS: int = 20000
+
+    # Compression (remote Token Company API vs. local extractive)
+    COMPRESS_LATENCY_BUDGET: float = 3.0 # seconds; slower remote compression falls back to local
+    COMPRESS_PROBE_INTERVAL: float = 300.0 # seconds between retries of a remote judged too slow
+    COMPRESS_CACHE_TTL: int = 86400
+
+    # Batch snapshots
+    SNAPSHOT_BATCH_MAX: int = 500
+    SCENARIO_GRID_MAX_CELLS: int = 500_000 # positions x shocks per grid request
+    SNAPSHOT_BATCH_CONCURRENCY: int = 16
+    CLOB_BATCH_SIZE: int = 100 # token ids per multi-token CLOB request
+    BOOK_CACHE_SIZE: int = 4096
+    BOOK_CACHE_TTL: float = 1.0 # seconds an upstream book is reused across snapshot/book requests
+
+    # Live order-book mirror (CLOB market websocket)
+    BOOK_MIRROR_ENABLED: bool = False
+    BOOK_MIRROR_MAX_TOKENS: int = 500
+    BOOK_MIRROR_MAX_AGE: float = 30.0 # seconds without any frame before mirrored books stop being served
+    BOOK_MIRROR_PING_INTERVAL: float = 10.0
+
+    # On-disk price history store (shared by worker processes)
+    PRICE_HISTORY_DIR: str = "data/price_history" # relative paths resolve against the backend directory
+    PRICE_HISTORY_REFRESH: float = 60.0 # seconds between upstream delta fetches per token
+
+    # Response compression (brotli is used when the package is installed)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024 # bytes; smaller bodies are sent as is
+    GZIP_LEVEL: int = 1 # ~6x cheaper than 6 on large numeric JSON for ~20% more bytes
+    BROTLI_QUALITY: int = 1
+
+    # Process pool for CPU-bound risk computations
+    RISK_POOL_ENABLED: bool = True
+    RISK_POOL_WORKERS: int | None = None # defaults to the CPU count
+    RISK_INLINE_MAX_COST: int = 2_000_000 # estimated array cells below which jobs run inline
+    RISK_JOB_TIMEOUT: float = 30.0
+    RISK_SHM_MIN_BYTES: int = 1_000_000 # result arrays at least this large return via shared memory
+
+    # Monte Carlo
+    MC_STREAMING_THRESHOLD: int = 20_000_000 # path cells above which runs (even method=exact) stream their quantiles
+    MC_MAX_HORIZON_DAYS: int = 365
+    MC_CHUNK_PATHS: int = 10_000
+    MC_HISTOGRAM_BINS: int = 4096
+
+    # Hedges (return correlations per event)
+    HEDGE_LOOKBACK_DAYS: int = 30
+    HEDGE_MIN_OBSERVATIONS: int = 24 # overlapping hourly moves required for a correlation
+    HEDGE_MAX_MARKETS: int = 250
+    HEDGE_FETCH_CONCURRENCY: int = 16
+    HEDGE_FETCH_BUDGET: float = 2.5 # seconds to wait for histories; stragglers are used next time
+    HEDGE_REFRESH_INTERVAL: float = 60.0
+    HEDGE_REBUILD_INTERVAL: float = 21600.0
+
+    # Portfolio risk (joint simulation)
+    PORTFOLIO_MAX_POSITIONS: int = 1000
+    PORTFOLIO_LOOKBACK_DAYS: int = 30
+    PORTFOLIO_SHRINKAGE: float = 0.2 # weight of the diagonal target in the covariance estimate
+    PORTFOLIO_DEFAULT_LOGIT_VOL: float = 0.15 # daily logit volatility for markets without history
+    PORTFOLIO_FETCH_CONCURRENCY: int = 16
+    PORTFOLIO_FETCH_BUDGET: float = 5.0
+    PORTFOLIO_BLOCK_CELLS: int = 2_000_000 # paths x markets simulated per block
+    PORTFOLIO_MAX_CELLS: int = 20_000_000 # paths x markets per request (~160 MB of float64 position P&L)
 
     # External APIs
     TAVILY_API_KEY: str | None = None
@@ -17,6 +131,8 @@ class Settings(BaseSettings):
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50
+    MEMORY_STORE_MAX_KEYS: int = 10000 # JSON values kept by the in-memory fallback when Redis is down
 
     # App Settings
     DEBUG: bool = True
@@ -0,0 +1,167 @@
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import brotli
+import msgpack
+import numpy as np
+import pyarrow
+import pyarrow.ipc
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+from app.config import get_settings
+
+settings = get_settings()
+
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+# --- Content negotiation ---
+
+def _accepted(request: Request) -> List[str]:
+    """Media types from the Accept header, most preferred first."""
+    ranked = []
+    for i, part in enumerate(request.headers.get("accept", "").split(",")):
+        media, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media and q > 0:
+            ranked.append((-q, i, media.lower()))
+    return [media for _, _, media in sorted(ranked)]
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+def _arrow(content: Dict[str, Any]) -> bytes:
+    columns = {k: v for k, v in content.items() if isinstance(v, (list, np.ndarray))}
+    # Scalars travel as schema metadata
+    metadata = {k: json.dumps(v, default=str) for k, v in content.items() if k not in columns}
+    batch = pyarrow.RecordBatch.from_pydict(columns, metadata=metadata)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+def _plain(content: Any) -> Any:
+    if isinstance(content, BaseModel):
+        return content.model_dump(mode="json")
+    if isinstance(content, list):
+        return [_plain(item) for item in content]
+    return content
+
+def negotiate(request: Request, content: Any, table: bool = False) -> Any:
+    """
+    Encode `content` (models, or a dict of columns) in a binary format if
+    the Accept header prefers one. Arrow is only offered
+    for `table` content: equal-length columns plus scalar metadata.
+    Otherwise JSON: models are returned unchanged for the route's
+    response_model, column dicts are written straight from their NumPy
+    arrays by orjson.
+    """
+    for media in _accepted(request):
+        if media == MSGPACK:
+            return Response(msgpack.packb(_plain(content), default=_msgpack_default), media_type=MSGPACK)
+        if media == ARROW and table:
+            return Response(_arrow(content), media_type=ARROW)
+        if media in ("application/json", "*/*", "application/*"):
+            break
+    return ORJSONResponse(content) if isinstance(content, dict) else content
+
+# --- Response compression ---
+
+def _encoding(request_headers: Headers) -> Optional[str]:
+    accepted = {part.split(";")[0].strip().lower() for part in request_headers.get("accept-encoding", "").split(",")}
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(settings.GZIP_LEVEL, zlib.DEFLATED, 31) # 31: gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # Flush every chunk so streamed bodies are not held back by the compressor
+        if self.encoding == "br":
+            return self._br.process(data) + (self._br.finish() if final else self._br.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class CompressionMiddleware:
+    """
+    gzip/brotli response compression, brotli preferred.
+    Bodies under COMPRESSION_MIN_SIZE, already-encoded responses and
+    event streams (which must reach the client per event) pass through.
+    """
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _encoding(Headers(scope=scope))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+        compressor: Optional[_Compressor] = None
+
+        async def send_compressed(message):
+            nonlocal start, passthrough, compressor
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                passthrough = "content-encoding" in headers or headers.get("content-type", "").startswith("text/event-stream")
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if start is not None:
+                first, start = start, None
+                headers = MutableHeaders(raw=first["headers"])
+                if passthrough or (not more and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(first)
+                else:
+                    compressor = _Compressor(encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    if more:
+                        del headers["Content-Length"]
+                    else:
+                        body = compressor.compress(body, final=True)
+                        headers["Content-Length"] = str(len(body))
+                        await send(first)
+                        await send({"type": "http.response.body", "body": body})
+                        return
+                    await send(first)
+            if passthrough:
+                await send(message)
+                return
+            await send({"type": "http.response.body", "body": compressor.compress(body, final=not more), "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,92 @@
+import asyncio
+import functools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import numpy as np
+from app.config import get_settings
+
+settings = get_settings()
+
+class ExecutorBusyError(Exception):
+    """Raised when a call waits longer than the executor's queue timeout."""
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool for one blocking SDK.
+
+    At most `max_workers` calls run at once; further callers wait for a
+    slot for up to `queue_timeout` seconds and then fail with
+    ExecutorBusyError, so a burst against one upstream (e.g. slow Reddit
+    searches) cannot starve the others the way a shared default executor
+    does. Queue wait times are recorded for /api/stats.
+    """
+    def __init__(self, name: str, max_workers: int, queue_timeout: Optional[float] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_timeout = queue_timeout or settings.EXECUTOR_QUEUE_TIMEOUT
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-sdk")
+        self._slots = asyncio.Semaphore(max_workers)
+        self._waits: deque = deque(maxlen=1000)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        queued_at = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ExecutorBusyError(f"{self.name} executor busy for {self.queue_timeout}s")
+        finally:
+            self.waiting -= 1
+        self._waits.append(time.monotonic() - queued_at)
+
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = np.fromiter(self._waits, dtype=np.float64)
+        return {
+            "max_workers": self.max_workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_ms": {
+                "mean": round(float(waits.mean()) * 1000, 2) if waits.size else 0.0,
+                "p95": round(float(np.quantile(waits, 0.95)) * 1000, 2) if waits.size else 0.0,
+                "max": round(float(waits.max()) * 1000, 2) if waits.size else 0.0
+            }
+        }
+
+# One pool per upstream SDK
+reddit_executor = BoundedExecutor("reddit", settings.REDDIT_EXECUTOR_WORKERS)
+tavily_executor = BoundedExecutor("tavily", settings.TAVILY_EXECUTOR_WORKERS)
+gemini_executor = BoundedExecutor("gemini", settings.GEMINI_EXECUTOR_WORKERS)
+
+EXECUTORS = {
+    "reddit": reddit_executor,
+    "tavily": tavily_executor,
+    "gemini": gemini_executor
+}
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: executor.stats() for name, executor in EXECUTORS.items()}
+
+def shutdown_executors():
+    for executor in EXECUTORS.values():
+        executor.shutdown()
@@ -1,8 +1,10 @@
 import google.generativeai as genai
+import asyncio
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, Optional
 from app.config import get_settings
 from app.llm.provider import BaseLLMProvider
+from app.executors import gemini_executor
 
 settings = get_settings()
 
@@ -22,9 +24,8 @@ class GeminiProvider(BaseLLMProvider):
             "response_mime_type": "application/json",
         }
         
-        # In a real app, we'd use asyncio.to_thread for the sync SDK
-        import asyncio
-        response = await asyncio.to_thread(
+        # The SDK is sync; run it on the Gemini pool
+        response = await gemini_executor.run(
             self.model.generate_content,
             prompt,
             generation_config=generation_config
@@ -36,3 +37,43 @@ class GeminiProvider(BaseLLMProvider):
             print(f"Failed to parse Gemini JSON: {str(e)}")
             # Fallback or retry logic
             return {}
+
+    async def stream_json(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        generation_config = {
+            "temperature": 0.1,
+            "response_mime_type": "application/json",
+        }
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            # Iterating the streamed response blocks per chunk, so it runs in a thread
+            try:
+                response = self.model.generate_content(prompt, generation_config=generation_config, stream=True)
+                for chunk in response:
+                    text = chunk.text
+                    if text:
+                        loop.call_soon_threadsafe(queue.put_nowait, text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = asyncio.create_task(gemini_executor.run(produce))
+        # A call rejected by the pool never runs `produce`; surface that to the consumer
+        producer.add_done_callback(
+            lambda task: queue.put_nowait(task.exception()) if not task.cancelled() and task.exception() else None
+        )
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # On early exit the thread drains the rest of the stream on its own
+            if producer.done():
+                await producer
@@ -0,0 +1,132 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+WHITESPACE = " \t\r\n"
+
+class _Frame:
+    __slots__ = ("kind", "path", "key", "index", "phase", "start")
+
+    def __init__(self, kind: str, path: Tuple):
+        self.kind = kind # "{" or "["
+        self.path = path
+        self.key: Optional[str] = None
+        self.index = 0
+        self.phase = "key" if kind == "{" else "value"
+        self.start = 0
+
+class IncrementalJSONParser:
+    """
+    Incremental JSON scanner for streamed LLM output.
+
+    `feed()` takes raw text chunks and returns `(path, value)` for every value
+    that has been completely received, down to `max_depth` levels: with the
+    default depth 2, `("headline_summary",)` is reported as soon as its
+    closing quote arrives and `("drivers", 0)` as soon as the first driver
+    object closes, long before the whole document is valid JSON. Text before
+    the first `{`/`[` (e.g. a Markdown fence) is ignored.
+    """
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self.buf = ""
+        self.pos = 0
+        self.stack: List[_Frame] = []
+        self.in_string = False
+        self.escape = False
+        self.string_role: Optional[str] = None
+        self.string_start = 0
+        self.primitive = False
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[Tuple, Any]]:
+        events: List[Tuple[Tuple, Any]] = []
+        self.buf += text
+        while self.pos < len(self.buf) and not self.done:
+            c = self.buf[self.pos]
+            if self.in_string:
+                self._scan_string(c, events)
+            elif self.primitive and c not in ",}]" and c not in WHITESPACE:
+                pass
+            else:
+                if self.primitive:
+                    # Numbers/true/false/null end at the next delimiter; re-scan it below
+                    self.primitive = False
+                    self._complete(self.stack[-1], self.pos, events)
+                self._scan(c, events)
+            self.pos += 1
+        return events
+
+    def _scan_string(self, c: str, events: List[Tuple[Tuple, Any]]):
+        if self.escape:
+            self.escape = False
+        elif c == "\\":
+            self.escape = True
+        elif c == '"':
+            self.in_string = False
+            frame = self.stack[-1]
+            if self.string_role == "key":
+                frame.key = json.loads(self.buf[self.string_start:self.pos + 1])
+                frame.phase = "colon"
+            else:
+                self._complete(frame, self.pos + 1, events)
+
+    def _scan(self, c: str, events: List[Tuple[Tuple, Any]]):
+        if c in WHITESPACE:
+            return
+        if not self.stack:
+            if c in "{[":
+                self.stack.append(_Frame(c, ()))
+            return
+
+        frame = self.stack[-1]
+        if frame.phase == "key":
+            if c == '"':
+                self._start_string("key")
+            elif c == "}":
+                self._close(events)
+        elif frame.phase == "colon":
+            if c == ":":
+                frame.phase = "value"
+        elif frame.phase == "value":
+            if c == "]" and frame.kind == "[":
+                self._close(events)
+                return
+            frame.start = self.pos
+            frame.phase = "in_value"
+            if c == '"':
+                self._start_string("value")
+            elif c in "{[":
+                child_key = frame.key if frame.kind == "{" else frame.index
+                self.stack.append(_Frame(c, frame.path + (child_key,)))
+            else:
+                self.primitive = True
+        elif frame.phase == "after":
+            if c == ",":
+                if frame.kind == "{":
+                    frame.phase = "key"
+                else:
+                    frame.index += 1
+                    frame.phase = "value"
+            elif c in "}]":
+                self._close(events)
+
+    def _start_string(self, role: str):
+        self.in_string = True
+        self.string_role = role
+        self.string_start = self.pos
+
+    def _close(self, events: List[Tuple[Tuple, Any]]):
+        self.stack.pop()
+        if not self.stack:
+            self.done = True
+            return
+        self._complete(self.stack[-1], self.pos + 1, events)
+
+    def _complete(self, frame: _Frame, end: int, events: List[Tuple[Tuple, Any]]):
+        frame.phase = "after"
+        child_key = frame.key if frame.kind == "{" else frame.index
+        path = frame.path + (child_key,)
+        if len(path) <= self.max_depth:
+            try:
+                events.append((path, json.loads(self.buf[frame.start:end])))
+            except ValueError:
+                pass
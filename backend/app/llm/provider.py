@@ -1,5 +1,6 @@
+import json
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, Optional
 
 class BaseLLMProvider(ABC):
     @abstractmethod
@@ -8,3 +9,10 @@ class BaseLLMProvider(ABC):
         Generate structured JSON output from a prompt.
         """
         pass
+
+    async def stream_json(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream the raw JSON text as it is generated, for incremental parsing.
+        Providers without streaming support yield the whole document at once.
+        """
+        yield json.dumps(await self.generate_json(prompt, schema))
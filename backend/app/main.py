@@ -1,24 +1,66 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+import asyncio
+import json
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from typing import List, Optional, Dict, Any
 from app.config import get_settings
+from app.encoding import CompressionMiddleware, negotiate
 from app.models import (
     Event, Market, MarketSnapshot, Orderbook, TimeseriesPoint,
+    BatchSnapshotRequest, BatchSnapshotResponse,
     AnalysisRequest, AnalysisResponse, ExplainMoveResult,
-    ScenarioResult, MonteCarloResult, LiquidityMetrics, HedgeRecommendation
+    ScenarioResult, MonteCarloResult, LiquidityMetrics, HedgeRecommendation,
+    PortfolioRiskRequest, PortfolioRiskResult, ScenarioGridRequest, ScenarioGridResult
 )
 from app.polymarket.gamma import GammaClient
+from app.polymarket.catalog import CatalogIndex, CatalogSyncer
 from app.polymarket.clob import ClobClient
+from app.polymarket.mirror import BookMirror
+from app.polymarket.transport import transport
 from app.analysis.pipeline import AnalysisPipeline
-from app.risk.scenario import ScenarioAnalyzer
+from app.analysis.scheduler import SchedulerFullError
+from app.risk.scenario import ScenarioAnalyzer, slider_shocks
 from app.risk.montecarlo import MonteCarloSimulator
 from app.risk.liquidity import LiquidityAnalyzer
 from app.risk.hedge import HedgeAnalyzer
+from app.risk.portfolio import PortfolioRiskEngine
 from app.storage.state import storage
+from app.storage.timeseries import price_history
+from app.storage.events import progress_bus
+from app.executors import ExecutorBusyError, executor_stats, shutdown_executors
+from app.risk.executor import RiskJobTimeout, risk_executor
 
 settings = get_settings()
 
-app = FastAPI(title="Poly-Terminal API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One keep-alive connection pool per upstream for the lifetime of the app
+    await transport.start()
+    price_history.open()
+    if settings.RISK_POOL_ENABLED:
+        risk_executor.start()
+    if catalog_syncer:
+        await catalog_syncer.start()
+    await storage.connect()
+    await progress_bus.start()
+    await pipeline.scheduler.start()
+    if mirror:
+        await mirror.start()
+    yield
+    if mirror:
+        await mirror.close()
+    await pipeline.scheduler.close()
+    await progress_bus.close()
+    await storage.close()
+    if catalog_syncer:
+        await catalog_syncer.close()
+    await transport.close()
+    shutdown_executors()
+    risk_executor.shutdown()
+
+app = FastAPI(title="Poly-Terminal API", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,15 +69,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
 # Clients
-gamma = GammaClient()
-clob = ClobClient()
-pipeline = AnalysisPipeline()
+catalog = CatalogIndex()
+catalog_syncer = CatalogSyncer(catalog) if settings.CATALOG_SYNC_ENABLED else None
+gamma = GammaClient(catalog)
+mirror = BookMirror() if settings.BOOK_MIRROR_ENABLED else None
+clob = ClobClient(gamma, mirror)
+pipeline = AnalysisPipeline(gamma, clob)
 scenario_analyzer = ScenarioAnalyzer()
 mc_simulator = MonteCarloSimulator()
 liquidity_analyzer = LiquidityAnalyzer()
-hedge_analyzer = HedgeAnalyzer()
+hedge_analyzer = HedgeAnalyzer(clob)
+portfolio_engine = PortfolioRiskEngine(gamma, clob)
 
 # --- Health ---
 
@@ -43,6 +91,20 @@ hedge_analyzer = HedgeAnalyzer()
 async def healthz():
     return {"status": "ok"}
 
+@app.get("/api/stats")
+async def stats():
+    return {
+        "market_cache": gamma.cache.stats(),
+        "book_cache": clob.book_cache.stats(),
+        "catalog": catalog_syncer.stats() if catalog_syncer else None,
+        "analysis_scheduler": pipeline.scheduler.stats(),
+        "extract_cache": pipeline.extractor.stats(),
+        "compression": pipeline.compressor.stats(),
+        "executors": executor_stats(),
+        "risk_pool": risk_executor.stats(),
+        "book_mirror": mirror.stats() if mirror else None
+    }
+
 # --- Polymarket Browsing ---
 
 @app.get("/api/events", response_model=List[Event])
@@ -73,52 +135,152 @@ async def get_market(market_id: str):
     return market
 
 @app.get("/api/search", response_model=List[Market])
-async def search_markets(q: str):
-    return await gamma.search_markets(q)
+async def search_markets(q: str, limit: int = Query(20, ge=1, le=100)):
+    return await gamma.search_markets(q, limit)
 
 # --- Live Market Data ---
 
+@app.post("/api/markets/snapshots", response_model=BatchSnapshotResponse)
+async def get_market_snapshots(request: BatchSnapshotRequest):
+    if len(request.market_ids) > settings.SNAPSHOT_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {settings.SNAPSHOT_BATCH_MAX} market ids per batch")
+    snapshots, errors = await clob.get_market_snapshots(request.market_ids)
+    return BatchSnapshotResponse(snapshots=snapshots, errors=errors)
+
+# format=columnar returns parallel arrays (epoch timestamps) instead of lists of objects;
+# an Accept header of application/msgpack or application/vnd.apache.arrow.stream picks a binary encoding
+
 @app.get("/api/markets/{market_id}/snapshot", response_model=MarketSnapshot)
-async def get_market_snapshot(market_id: str):
-    snapshot = await clob.get_market_snapshot(market_id)
+async def get_market_snapshot(
+    request: Request,
+    market_id: str,
+    format: str = Query("objects", pattern="^(objects|columnar)$")
+):
+    if format == "columnar":
+        snapshot = await clob.get_market_snapshot_columns(market_id)
+    else:
+        snapshot = await clob.get_market_snapshot(market_id)
     if not snapshot:
         raise HTTPException(status_code=404, detail="Snapshot not available for this market")
-    return snapshot
+    return negotiate(request, snapshot)
 
 @app.get("/api/markets/{market_id}/orderbook", response_model=Orderbook)
-async def get_orderbook(market_id: str, depth: int = 50):
+async def get_orderbook(
+    request: Request,
+    market_id: str,
+    depth: int = 50,
+    format: str = Query("objects", pattern="^(objects|columnar)$")
+):
     market = await gamma.get_market(market_id)
     if not market or not market.clob_token_ids:
         raise HTTPException(status_code=404, detail="CLOB data not available for this market")
-    return await clob.get_orderbook(market.clob_token_ids[0])
+    if format == "columnar":
+        book = await clob.get_book(market.clob_token_ids[0])
+        return negotiate(request, book.to_columns(depth))
+    return negotiate(request, await clob.get_orderbook(market.clob_token_ids[0], depth))
 
 @app.get("/api/markets/{market_id}/timeseries", response_model=List[TimeseriesPoint])
 async def get_timeseries(
+    request: Request,
     market_id: str, 
     interval: str = "1h", 
-    lookback_days: int = 30
+    lookback_days: int = 30,
+    format: str = Query("objects", pattern="^(objects|columnar)$")
 ):
     market = await gamma.get_market(market_id)
     if not market or not market.clob_token_ids:
         raise HTTPException(status_code=404, detail="Timeseries not available for this market")
-    return await clob.get_timeseries(market.clob_token_ids[0], interval, lookback_days)
+    if format == "columnar":
+        return negotiate(request, await clob.get_timeseries_columns(market.clob_token_ids[0], interval, lookback_days), table=True)
+    return negotiate(request, await clob.get_timeseries(market.clob_token_ids[0], interval, lookback_days))
 
 # --- Analysis ---
 
 @app.post("/api/analysis", response_model=AnalysisResponse)
 async def create_analysis(request: AnalysisRequest):
-    analysis_id = await pipeline.run_analysis(request)
-    return AnalysisResponse(analysis_id=analysis_id, status="queued")
+    try:
+        analysis_id = await pipeline.run_analysis(request)
+    except SchedulerFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    data = await pipeline.get_state(analysis_id)
+    return AnalysisResponse(**data) if data else AnalysisResponse(analysis_id=analysis_id, status="queued")
 
 @app.get("/api/analysis/{analysis_id}", response_model=AnalysisResponse)
 async def get_analysis(analysis_id: str):
-    data = storage.get(f"analysis:{analysis_id}")
+    data = await pipeline.get_state(analysis_id)
     if not data:
         raise HTTPException(status_code=404, detail="Analysis not found")
     return AnalysisResponse(**data)
 
+TERMINAL_STATUSES = ("completed", "failed")
+
+async def _analysis_events(analysis_id: str):
+    """
+    Current state first, then every pushed transition until the analysis finishes.
+    Subscribes before reading state so no transition can fall in between.
+    Yields None as a keepalive tick when nothing happened for a while.
+    """
+    async with progress_bus.subscribe(analysis_id) as queue:
+        state = await pipeline.get_state(analysis_id)
+        if not state:
+            return
+        yield state
+        if state["status"] in TERMINAL_STATUSES:
+            return
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.ANALYSIS_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            yield event
+            if event["status"] in TERMINAL_STATUSES:
+                return
+
+@app.get("/api/analysis/{analysis_id}/events")
+async def stream_analysis(analysis_id: str):
+    if not await pipeline.get_state(analysis_id):
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    async def sse():
+        async for event in _analysis_events(analysis_id):
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/api/analysis/{analysis_id}/ws")
+async def stream_analysis_ws(websocket: WebSocket, analysis_id: str):
+    await websocket.accept()
+    if not await pipeline.get_state(analysis_id):
+        await websocket.close(code=4404, reason="Analysis not found")
+        return
+    try:
+        async for event in _analysis_events(analysis_id):
+            if event is not None:
+                await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
 # --- Risk Tools ---
 
+@contextmanager
+def risk_errors():
+    # Errors from the risk process pool, as HTTP responses
+    try:
+        yield
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except RiskJobTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
 @app.post("/api/risk/scenario", response_model=ScenarioResult)
 async def compute_scenario(
     market_id: str, 
@@ -130,18 +292,50 @@ async def compute_scenario(
         raise HTTPException(status_code=404, detail="Market snapshot not available")
     return scenario_analyzer.compute_scenarios(snapshot, position, shocks)
 
+@app.post("/api/risk/scenario/grid", response_model=ScenarioGridResult)
+async def compute_scenario_grid(request: ScenarioGridRequest):
+    n_shocks = len(request.shocks) if request.shocks is not None else len(slider_shocks())
+    if len(request.positions) * n_shocks > settings.SCENARIO_GRID_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.SCENARIO_GRID_MAX_CELLS} positions x shocks per grid")
+    market_ids = list(dict.fromkeys(p.market_id for p in request.positions))
+    if len(market_ids) > settings.SNAPSHOT_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {settings.SNAPSHOT_BATCH_MAX} distinct markets per grid")
+
+    snapshots, errors = await clob.get_market_snapshots(market_ids)
+    positions = [p for p in request.positions if p.market_id in snapshots]
+    with risk_errors():
+        result = await scenario_analyzer.compute_grid(
+            [p.market_id for p in positions],
+            [snapshots[p.market_id].price for p in positions],
+            [p.shares for p in positions],
+            [p.avg_price for p in positions],
+            request.shocks,
+            errors
+        )
+    # Serialize in pydantic-core; the default encoder path dominates the latency for large grids
+    return Response(content=result.model_dump_json(), media_type="application/json")
+
 @app.post("/api/risk/montecarlo", response_model=MonteCarloResult)
 async def run_montecarlo(
+    request: Request,
     market_id: str, 
-    horizon_days: int = 30, 
-    n_paths: int = 1000
+    horizon_days: int = Query(30, ge=1, le=settings.MC_MAX_HORIZON_DAYS), 
+    n_paths: int = Query(1000, ge=1, le=10_000_000),
+    seed: Optional[int] = None,
+    precision: str = Query("float64", pattern="^(float32|float64)$"),
+    method: str = Query("auto", pattern="^(auto|exact|streaming)$")
 ):
     market = await gamma.get_market(market_id)
     if not market or not market.clob_token_ids:
         raise HTTPException(status_code=404, detail="Market not found")
         
     timeseries = await clob.get_timeseries(market.clob_token_ids[0])
-    return mc_simulator.run_monte_carlo(timeseries, horizon_days, n_paths)
+    with risk_errors():
+        result = await risk_executor.run(
+            mc_simulator.run_monte_carlo, timeseries, horizon_days, n_paths, seed=seed, precision=precision, method=method,
+            cost=mc_simulator.estimate_cost(horizon_days, n_paths)
+        )
+    return negotiate(request, result)
 
 @app.get("/api/risk/liquidity/{market_id}", response_model=LiquidityMetrics)
 async def get_liquidity(market_id: str):
@@ -149,8 +343,12 @@ async def get_liquidity(market_id: str):
     if not market or not market.clob_token_ids:
         raise HTTPException(status_code=404, detail="Market not found")
         
-    orderbook = await clob.get_orderbook(market.clob_token_ids[0])
-    return liquidity_analyzer.compute_liquidity_metrics(orderbook, market_id)
+    book = await clob.get_book(market.clob_token_ids[0])
+    with risk_errors():
+        return await risk_executor.run(
+            liquidity_analyzer.compute_liquidity_metrics, book, market_id,
+            cost=liquidity_analyzer.estimate_cost(book)
+        )
 
 @app.post("/api/risk/hedge", response_model=HedgeRecommendation)
 async def suggest_hedge(
@@ -162,12 +360,29 @@ async def suggest_hedge(
         raise HTTPException(status_code=404, detail="Market not found")
         
     # Get related markets from the same event
-    if current_market.group_id:
-        related_markets = await gamma.get_event_markets(current_market.group_id)
+    event_id = catalog.market_event.get(market_id) or current_market.group_id
+    if event_id:
+        related_markets = await gamma.get_event_markets(event_id)
     else:
         related_markets = []
         
-    return hedge_analyzer.suggest_hedges(current_market, position, related_markets)
+    return await hedge_analyzer.suggest_hedges(current_market, position, related_markets, event_id)
+
+@app.post("/api/risk/portfolio", response_model=PortfolioRiskResult)
+async def portfolio_risk(request: PortfolioRiskRequest):
+    if not request.positions:
+        raise HTTPException(status_code=400, detail="No positions")
+    if len(request.positions) > settings.PORTFOLIO_MAX_POSITIONS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PORTFOLIO_MAX_POSITIONS} positions")
+    n_markets = len({p.market_id for p in request.positions})
+    if n_markets * request.n_paths > settings.PORTFOLIO_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PORTFOLIO_MAX_CELLS} markets x paths per request")
+
+    with risk_errors():
+        result = await portfolio_engine.analyze(request)
+    if not result.positions:
+        raise HTTPException(status_code=404, detail="None of the markets were found")
+    return result
 
 if __name__ == "__main__":
     import uvicorn
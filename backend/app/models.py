@@ -54,6 +54,13 @@ class MarketSnapshot(BaseModel):
     timestamp: datetime
     token_id: str
 
+class BatchSnapshotRequest(BaseModel):
+    market_ids: List[str]
+
+class BatchSnapshotResponse(BaseModel):
+    snapshots: Dict[str, MarketSnapshot] # market_id -> snapshot
+    errors: Dict[str, str] # market_id -> error message
+
 class TimeseriesPoint(BaseModel):
     timestamp: str
     price: float
@@ -96,12 +103,17 @@ class AnalysisRequest(BaseModel):
     include_reddit: bool = True
     max_news_sources: int = 10
     max_reddit_threads: int = 10
+    priority: int = 0 # lower runs first; not part of request deduplication
 
 class AnalysisResponse(BaseModel):
     analysis_id: str
     status: str # "queued" | "processing" | "completed" | "failed"
     progress: float = 0.0
     result: Optional[ExplainMoveResult] = None
+    cached: bool = False # result served from the analysis result cache
+    stage: Optional[str] = None # "queued" | "market_data" | "search" | "extract" | "compress" | "llm" | "completed" | "failed"
+    error: Optional[str] = None
+    partial: Optional[Dict[str, Any]] = None # headline_summary/drivers streamed before the result is complete
 
 # --- Risk ---
 
@@ -121,11 +133,71 @@ class ScenarioResult(BaseModel):
     scenarios: List[Scenario]
     slider_model: Dict[str, Any] # {unit: "pct", min:-50, max:+50, step:1}
 
+class ScenarioGridPosition(BaseModel):
+    market_id: str
+    shares: float
+    avg_price: Optional[float] = None # defaults to the current price
+
+class ScenarioGridRequest(BaseModel):
+    positions: List[ScenarioGridPosition]
+    shocks: Optional[List[float]] = None # defaults to every slider step
+
+class ScenarioGridResult(BaseModel):
+    # Columnar: one row per position, one column per shock
+    shocks: List[float]
+    market_ids: List[str]
+    base_prices: List[float]
+    projected_prices: List[List[float]]
+    pnl: List[List[float]]
+    total_pnl: List[float] # per shock, summed over positions
+    max_loss: List[float]
+    max_gain: List[float]
+    slider_model: Dict[str, Any]
+    errors: Dict[str, str] = {} # market_id -> reason the position was skipped
+
 class MonteCarloResult(BaseModel):
     horizon_days: int
     n_paths: int
     bands: Dict[str, List[float]] # {p5[], p25[], p50[], p75[], p95[]}
     sample_paths: Optional[List[List[float]]] = None
+    seed: Optional[int] = None # RNG seed, pass back to reproduce the run
+    method: Optional[str] = None # "exact" | "streaming"
+
+class PortfolioPosition(BaseModel):
+    market_id: str
+    shares: float # negative for a short position
+    outcome: str = Field("YES", pattern="^(YES|NO)$")
+
+class PortfolioRiskRequest(BaseModel):
+    positions: List[PortfolioPosition]
+    horizon_days: int = Field(7, ge=1, le=365)
+    n_paths: int = Field(10_000, ge=100, le=200_000)
+    confidence: float = Field(0.95, gt=0.5, lt=1.0)
+    seed: Optional[int] = None
+
+class PositionRisk(BaseModel):
+    market_id: str
+    shares: float # net YES-equivalent shares across the market's positions
+    price: float
+    value: float
+    daily_vol: float # of the price, from the logit-space model
+    standalone_var: float
+    cvar_contribution: float # Euler/CVaR allocation; sums to the portfolio CVaR
+    variance_share: float # cov(position P&L, portfolio P&L) / var(portfolio P&L); sums to 1
+
+class PortfolioRiskResult(BaseModel):
+    horizon_days: int
+    n_paths: int
+    confidence: float
+    seed: int
+    value: float
+    expected_pnl: float
+    var: float
+    cvar: float
+    pnl_quantiles: Dict[str, float]
+    pnl_histogram: Dict[str, List[float]] # {edges[], counts[]}
+    positions: List[PositionRisk]
+    caveats: List[str]
 
 class HedgeMarket(BaseModel):
     market_id: str
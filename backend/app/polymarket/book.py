@@ -0,0 +1,127 @@
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.models import Orderbook, OrderbookLevel
+
+def _parse_levels(levels: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    # CLOB levels arrive either as [price, size] pairs or {"price": ..., "size": ...} objects
+    if not levels:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+    if isinstance(levels[0], dict):
+        arr = np.array([(l["price"], l["size"]) for l in levels], dtype=np.float64)
+    else:
+        arr = np.array([l[:2] for l in levels], dtype=np.float64)
+    return arr[:, 0], arr[:, 1]
+
+class BookSide:
+    """
+    One side of an order book as parallel price/size arrays, sorted best-first,
+    with cumulative shares and notional precomputed for fill calculations.
+    """
+    def __init__(self, prices: np.ndarray, sizes: np.ndarray, descending: bool):
+        order = np.argsort(-prices if descending else prices, kind="stable")
+        self.prices = np.ascontiguousarray(prices[order])
+        self.sizes = np.ascontiguousarray(sizes[order])
+        self.notional = self.prices * self.sizes
+        self.cum_shares = np.cumsum(self.sizes)
+        self.cum_notional = np.cumsum(self.notional)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @property
+    def best(self) -> Optional[float]:
+        return float(self.prices[0]) if len(self.prices) else None
+
+    def fill(self, notionals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Walk the book for every USD notional at once.
+        Returns (shares bought, fully_filled) arrays aligned with `notionals`.
+        """
+        notionals = np.asarray(notionals, dtype=np.float64)
+        n = len(self.prices)
+        if n == 0:
+            return np.zeros_like(notionals), np.zeros(notionals.shape, dtype=bool)
+
+        # First level whose cumulative notional covers the order
+        idx = np.searchsorted(self.cum_notional, notionals, side="left")
+        filled = idx < n
+        i = np.minimum(idx, n - 1)
+        prev_notional = np.where(i > 0, self.cum_notional[i - 1], 0.0)
+        prev_shares = np.where(i > 0, self.cum_shares[i - 1], 0.0)
+
+        shares = np.where(
+            filled,
+            prev_shares + (notionals - prev_notional) / self.prices[i],
+            self.cum_shares[-1]
+        )
+        return shares, filled
+
+    def levels(self, depth: Optional[int] = None) -> List[OrderbookLevel]:
+        prices = self.prices[:depth].tolist()
+        sizes = self.sizes[:depth].tolist()
+        return [OrderbookLevel(price=p, size=s) for p, s in zip(prices, sizes)]
+
+class OrderBook:
+    """
+    Compact NumPy-backed order book. Built straight from CLOB JSON; pydantic
+    `Orderbook` models are only materialized at the response boundary.
+    """
+    def __init__(
+        self,
+        bid_prices: np.ndarray,
+        bid_sizes: np.ndarray,
+        ask_prices: np.ndarray,
+        ask_sizes: np.ndarray,
+        timestamp: Optional[datetime] = None,
+        last_trade_price: Optional[float] = None
+    ):
+        self.bids = BookSide(bid_prices, bid_sizes, descending=True)
+        self.asks = BookSide(ask_prices, ask_sizes, descending=False)
+        self.timestamp = timestamp or datetime.now()
+        self.last_trade_price = last_trade_price
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "OrderBook":
+        bid_prices, bid_sizes = _parse_levels(data.get("bids", []))
+        ask_prices, ask_sizes = _parse_levels(data.get("asks", []))
+        # Recent CLOB book payloads carry the last trade, which saves a /price call
+        last_trade = data.get("last_trade_price")
+        return cls(bid_prices, bid_sizes, ask_prices, ask_sizes, last_trade_price=float(last_trade) if last_trade else None)
+
+    @classmethod
+    def from_model(cls, orderbook: Orderbook) -> "OrderBook":
+        bids = np.array([(l.price, l.size) for l in orderbook.bids], dtype=np.float64).reshape(-1, 2)
+        asks = np.array([(l.price, l.size) for l in orderbook.asks], dtype=np.float64).reshape(-1, 2)
+        return cls(bids[:, 0], bids[:, 1], asks[:, 0], asks[:, 1], orderbook.timestamp)
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bids.best
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.asks.best
+
+    @property
+    def midpoint(self) -> Optional[float]:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_bid + self.best_ask) / 2
+
+    def to_columns(self, depth: Optional[int] = None) -> Dict[str, Any]:
+        # Columnar form of to_model(): parallel price/size arrays per side, epoch timestamp
+        return {
+            "bid_prices": self.bids.prices[:depth],
+            "bid_sizes": self.bids.sizes[:depth],
+            "ask_prices": self.asks.prices[:depth],
+            "ask_sizes": self.asks.sizes[:depth],
+            "timestamp": self.timestamp.timestamp()
+        }
+
+    def to_model(self, depth: Optional[int] = None) -> Orderbook:
+        return Orderbook(
+            bids=self.bids.levels(depth),
+            asks=self.asks.levels(depth),
+            timestamp=self.timestamp
+        )
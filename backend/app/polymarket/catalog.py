@@ -0,0 +1,292 @@
+import asyncio
+import json
+import os
+import time
+from itertools import islice
+from typing import Any, Dict, List, Optional, Set
+from app.config import get_settings
+from app.models import Event, Market
+from app.polymarket.gamma import parse_event, parse_market
+from app.polymarket.search import MarketSearchIndex
+from app.polymarket.transport import transport
+
+settings = get_settings()
+
+SNAPSHOT_VERSION = 1
+
+class CatalogIndex:
+    """
+    In-memory index of the active Gamma catalog, kept current by
+    CatalogSyncer: id -> Market, event -> markets, CLOB token -> market and
+    category -> markets, plus a full-text MarketSearchIndex. Snapshotted to disk so a restart serves from the
+    index immediately instead of waiting for a full sync.
+    """
+    def __init__(self):
+        self.events: Dict[str, Event] = {}
+        self.markets: Dict[str, Market] = {}
+        self.event_markets: Dict[str, List[str]] = {}
+        self.market_event: Dict[str, str] = {}
+        self.tokens: Dict[str, str] = {}
+        self.categories: Dict[str, Set[str]] = {}
+        self.updated_at: Dict[str, str] = {}
+        self.watermark = "" # newest event updatedAt seen (ISO 8601 sorts lexically)
+        self.synced_at = 0.0
+        self._by_volume: Optional[List[str]] = None
+        self.search_index = MarketSearchIndex()
+
+    def is_fresh(self) -> bool:
+        return bool(self.events) and time.time() - self.synced_at < settings.CATALOG_MAX_AGE
+
+    # --- Updates ---
+
+    def upsert_event(self, item: Dict[str, Any]):
+        event = parse_event(item)
+        self.remove_event(event.id)
+
+        markets = [parse_market(raw) for raw in item.get("markets") or []]
+        self._add_event(event, markets)
+        updated_at = item.get("updatedAt") or ""
+        self.updated_at[event.id] = updated_at
+        self.watermark = max(self.watermark, updated_at)
+        self._by_volume = None
+
+    def _add_event(self, event: Event, markets: List[Market]):
+        # Closed markets stay listed under their event (as upstream returns them)
+        # but are not offered by search or category listings
+        self.events[event.id] = event
+        self.event_markets[event.id] = [m.id for m in markets]
+        for market in markets:
+            self.markets[market.id] = market
+            self.market_event[market.id] = event.id
+            for token_id in market.clob_token_ids or []:
+                self.tokens[token_id] = market.id
+            if market.closed:
+                continue
+            if event.category:
+                self.categories.setdefault(event.category, set()).add(market.id)
+            self.search_index.upsert(market, event.title)
+
+    def remove_event(self, event_id: str):
+        event = self.events.pop(event_id, None)
+        if event is None:
+            return
+        for market_id in self.event_markets.pop(event_id, []):
+            market = self.markets.pop(market_id, None)
+            self.market_event.pop(market_id, None)
+            self.search_index.remove(market_id)
+            if market:
+                for token_id in market.clob_token_ids or []:
+                    if self.tokens.get(token_id) == market_id:
+                        del self.tokens[token_id]
+            if event.category and event.category in self.categories:
+                self.categories[event.category].discard(market_id)
+                if not self.categories[event.category]:
+                    del self.categories[event.category]
+        self.updated_at.pop(event_id, None)
+        self._by_volume = None
+
+    # --- Lookups ---
+
+    def get_event(self, event_id: str) -> Optional[Event]:
+        return self.events.get(event_id)
+
+    def get_market(self, market_id: str) -> Optional[Market]:
+        return self.markets.get(market_id)
+
+    def get_event_markets(self, event_id: str) -> List[Market]:
+        return [self.markets[m] for m in self.event_markets.get(event_id, []) if m in self.markets]
+
+    def get_market_event(self, market_id: str) -> Optional[Event]:
+        event_id = self.market_event.get(market_id)
+        return self.events.get(event_id) if event_id else None
+
+    def get_market_by_token(self, token_id: str) -> Optional[Market]:
+        market_id = self.tokens.get(token_id)
+        return self.markets.get(market_id) if market_id else None
+
+    def get_category_markets(self, category: str) -> List[Market]:
+        return [self.markets[m] for m in self.categories.get(category, ()) if m in self.markets]
+
+    def list_events(self, limit: int = 50, offset: int = 0, search: Optional[str] = None) -> List[Event]:
+        if self._by_volume is None:
+            self._by_volume = sorted(self.events, key=lambda e: -self.events[e].volume)
+        events = (self.events[e] for e in self._by_volume)
+        if search:
+            terms = search.lower().split()
+            events = (e for e in events if all(t in e.title.lower() for t in terms))
+        return list(islice(events, offset, offset + limit))
+
+    def search_markets(self, query: str, limit: int = 20) -> List[Market]:
+        return self.search_index.search(query, limit)
+
+    # --- Snapshots ---
+
+    def save(self, path: str):
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "synced_at": self.synced_at,
+            "watermark": self.watermark,
+            "events": [
+                {
+                    "event": event.model_dump(),
+                    "markets": [self.markets[m].model_dump() for m in self.event_markets.get(event_id, [])],
+                    "updated_at": self.updated_at.get(event_id, "")
+                }
+                for event_id, event in self.events.items()
+            ]
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        # Atomic swap: readers never see a partial snapshot
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> bool:
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Catalog snapshot unreadable, ignoring: {str(e)}")
+            return False
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return False
+
+        for entry in snapshot["events"]:
+            event = Event(**entry["event"])
+            self._add_event(event, [Market(**m) for m in entry["markets"]])
+            self.updated_at[event.id] = entry.get("updated_at", "")
+        self.synced_at = snapshot.get("synced_at", 0.0)
+        self.watermark = snapshot.get("watermark", "")
+        self._by_volume = None
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "events": len(self.events),
+            "markets": len(self.markets),
+            "tokens": len(self.tokens),
+            "categories": len(self.categories),
+            "search_terms": len(self.search_index.postings),
+            "age": round(time.time() - self.synced_at, 1) if self.synced_at else None,
+            "fresh": self.is_fresh()
+        }
+
+class CatalogSyncer:
+    """
+    Background sync of the Gamma events catalog into a CatalogIndex.
+
+    A full sync pages through every active event (and drops events that
+    are no longer listed) every CATALOG_FULL_SYNC_INTERVAL seconds. In
+    between, every CATALOG_SYNC_INTERVAL seconds, an incremental sync reads
+    events newest-`updatedAt`-first until it reaches the index watermark,
+    upserting active events and removing closed ones.
+    """
+    def __init__(self, index: CatalogIndex, snapshot_path: Optional[str] = None):
+        self.index = index
+        self.snapshot_path = snapshot_path or settings.CATALOG_SNAPSHOT_PATH
+        self._task: Optional[asyncio.Task] = None
+        self._last_full = 0.0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.errors = 0
+
+    async def start(self):
+        if self._task is not None:
+            return
+        if await asyncio.to_thread(self.index.load, self.snapshot_path):
+            print(f"Catalog warm start: {len(self.index.events)} events from snapshot")
+            # A recent snapshot only needs the incremental catch-up
+            self._last_full = self.index.synced_at
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                if time.time() - self._last_full >= settings.CATALOG_FULL_SYNC_INTERVAL:
+                    await self.sync_full()
+                else:
+                    await self.sync_incremental()
+                await asyncio.to_thread(self.index.save, self.snapshot_path)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"Catalog sync error: {str(e)}")
+            await asyncio.sleep(settings.CATALOG_SYNC_INTERVAL)
+
+    async def _fetch_page(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        resp = await transport.gamma.get("/events", params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def sync_full(self):
+        seen = set()
+        page_size = settings.CATALOG_PAGE_SIZE
+        offset = 0
+        while True:
+            page = await self._fetch_page({
+                "limit": page_size,
+                "offset": offset,
+                "active": "true",
+                "closed": "false"
+            })
+            for item in page:
+                self.index.upsert_event(item)
+                seen.add(str(item.get("id")))
+            if len(page) < page_size:
+                break
+            offset += page_size
+
+        for event_id in [e for e in self.index.events if e not in seen]:
+            self.index.remove_event(event_id)
+        self.index.synced_at = self._last_full = time.time()
+        self.full_syncs += 1
+
+    async def sync_incremental(self):
+        watermark = self.index.watermark
+        page_size = settings.CATALOG_PAGE_SIZE
+        for page_number in range(settings.CATALOG_MAX_INCREMENTAL_PAGES):
+            page = await self._fetch_page({
+                "limit": page_size,
+                "offset": page_number * page_size,
+                "order": "updatedAt",
+                "ascending": "false"
+            })
+            reached = False
+            for item in page:
+                if (item.get("updatedAt") or "") <= watermark:
+                    reached = True
+                    break
+                if item.get("active", True) and not item.get("closed", False):
+                    self.index.upsert_event(item)
+                else:
+                    self.index.remove_event(str(item.get("id")))
+                    self.index.watermark = max(self.index.watermark, item.get("updatedAt") or "")
+            if reached or len(page) < page_size:
+                break
+        else:
+            # More changes than the incremental window covers; catch up with a full sync
+            self._last_full = 0.0
+            return
+        self.index.synced_at = time.time()
+        self.incremental_syncs += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.index.stats(),
+            "full_syncs": self.full_syncs,
+            "incremental_syncs": self.incremental_syncs,
+            "errors": self.errors
+        }
@@ -1,105 +1,318 @@
+import asyncio
+import time
 import httpx
-from typing import List, Optional, Dict, Any
+import numpy as np
+from typing import List, Optional, Dict, Any, Tuple, Union
 from datetime import datetime
 from app.config import get_settings
-from app.models import MarketSnapshot, Orderbook, OrderbookLevel, TimeseriesPoint
+from app.models import Market, MarketSnapshot, Orderbook, TimeseriesPoint
+from app.polymarket.book import OrderBook
 from app.polymarket.gamma import GammaClient
+from app.polymarket.mirror import BookMirror
+from app.polymarket.transport import transport
+from app.storage.cache import TTLCache
+from app.storage.timeseries import price_history
 
 settings = get_settings()
 
 class ClobClient:
-    def __init__(self):
+    def __init__(self, gamma: Optional[GammaClient] = None, mirror: Optional[BookMirror] = None):
         self.base_url = settings.POLYMARKET_CLOB_URL
-        self.gamma = GammaClient()
-
-    async def get_orderbook(self, token_id: str) -> Orderbook:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/order-book", params={"token_id": token_id})
-            resp.raise_for_status()
-            data = resp.json()
-            
-            bids = [OrderbookLevel(price=float(b[0]), size=float(b[1])) for b in data.get("bids", [])]
-            asks = [OrderbookLevel(price=float(a[0]), size=float(a[1])) for a in data.get("asks", [])]
-            
-            return Orderbook(
-                bids=bids,
-                asks=asks,
-                timestamp=datetime.now()
-            )
-
-    async def get_midpoint(self, token_id: str) -> float:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/midpoint", params={"token_id": token_id})
-            resp.raise_for_status()
-            data = resp.json()
-            return float(data.get("midpoint", 0))
-
-    async def get_price(self, token_id: str) -> float:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/price", params={"token_id": token_id})
-            resp.raise_for_status()
-            data = resp.json()
-            return float(data.get("price", 0))
-
-    async def get_market_snapshot(self, market_id: str) -> Optional[MarketSnapshot]:
-        market = await self.gamma.get_market(market_id)
+        self.gamma = gamma or GammaClient()
+        self.mirror = mirror
+        self._background = set()
+        # Micro-cache of upstream books: a burst of clients watching one market shares a fetch
+        self.book_cache = TTLCache(maxsize=settings.BOOK_CACHE_SIZE, ttl=settings.BOOK_CACHE_TTL)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return transport.clob
+
+    async def get_book(self, token_id: str) -> OrderBook:
+        if self.mirror:
+            book = self.mirror.get_book(token_id)
+            if book is not None:
+                return book
+            # Start mirroring so the next read is served locally
+            self.mirror.watch(token_id)
+
+        return await self.book_cache.get_or_load(token_id, lambda: self._fetch_book(token_id))
+
+    async def _fetch_book(self, token_id: str) -> OrderBook:
+        resp = await self.http.get("/order-book", params={"token_id": token_id})
+        resp.raise_for_status()
+        return OrderBook.from_json(resp.json())
+
+    async def get_orderbook(self, token_id: str, depth: Optional[int] = None) -> Orderbook:
+        book = await self.get_book(token_id)
+        return book.to_model(depth)
+
+    async def get_market_snapshot(self, market: Union[str, Market]) -> Optional[MarketSnapshot]:
+        """
+        Snapshot of a market's first token, from a market id or an already
+        resolved Market (saving the Gamma lookup). Only the book is fetched:
+        midpoint and top of book come from it, the price from the last trade.
+        """
+        if isinstance(market, str):
+            market = await self.gamma.get_market(market)
         if not market or not market.clob_token_ids:
             return None
-        
+
         # Use the first token ID (usually the "Yes" outcome)
         token_id = market.clob_token_ids[0]
-        
-        async with httpx.AsyncClient() as client:
-            # Parallel calls for performance
-            import asyncio
-            midpoint_task = self.get_midpoint(token_id)
-            price_task = self.get_price(token_id)
-            orderbook_task = self.get_orderbook(token_id)
-            
-            midpoint, price, orderbook = await asyncio.gather(midpoint_task, price_task, orderbook_task)
-            
-            bid_top = orderbook.bids[0].price if orderbook.bids else None
-            ask_top = orderbook.asks[0].price if orderbook.asks else None
-            spread = (ask_top - bid_top) if (ask_top and bid_top) else 0
-            
-            return MarketSnapshot(
-                market_id=market_id,
-                price=price,
-                midpoint=midpoint,
-                bid_top=bid_top,
-                ask_top=ask_top,
-                spread=spread,
-                depth_ladders={
-                    "bids": orderbook.bids[:50],
-                    "asks": orderbook.asks[:50]
-                },
-                timestamp=datetime.now(),
-                token_id=token_id
-            )
+        book = await self.get_book(token_id)
+        midpoint = book.midpoint or 0
+        return self._build_snapshot(market.id, token_id, self._last_price(token_id, book) or midpoint, midpoint, book)
+
+    async def get_market_snapshot_columns(self, market: Union[str, Market], depth: int = 50) -> Optional[Dict[str, Any]]:
+        """get_market_snapshot() with the depth ladders as parallel arrays and an epoch timestamp."""
+        if isinstance(market, str):
+            market = await self.gamma.get_market(market)
+        if not market or not market.clob_token_ids:
+            return None
+
+        token_id = market.clob_token_ids[0]
+        book = await self.get_book(token_id)
+        midpoint = book.midpoint or 0
+        bid_top, ask_top = book.best_bid, book.best_ask
+        return {
+            "market_id": market.id,
+            "token_id": token_id,
+            "price": self._last_price(token_id, book) or midpoint,
+            "midpoint": midpoint,
+            "bid_top": bid_top,
+            "ask_top": ask_top,
+            "spread": (ask_top - bid_top) if (ask_top and bid_top) else 0,
+            "depth": book.to_columns(depth),
+            "timestamp": time.time()
+        }
+
+    def _last_price(self, token_id: str, book: OrderBook) -> Optional[float]:
+        if self.mirror:
+            price = self.mirror.get_last_trade_price(token_id)
+            if price is not None:
+                return price
+        return book.last_trade_price
+
+    async def get_market_snapshots(
+        self,
+        market_ids: List[str]
+    ) -> Tuple[Dict[str, MarketSnapshot], Dict[str, str]]:
+        """
+        Snapshots for many markets at once. Token ids are deduped, books come
+        from the mirror, the book micro-cache or the multi-token /books
+        endpoint (midpoints and prices are derived from them), and failures
+        are reported per market id instead of failing the batch.
+        """
+        semaphore = asyncio.Semaphore(settings.SNAPSHOT_BATCH_CONCURRENCY)
+        errors: Dict[str, str] = {}
+
+        async def resolve(market_id: str):
+            async with semaphore:
+                try:
+                    return market_id, await self.gamma.get_market(market_id)
+                except Exception as e:
+                    errors[market_id] = f"Market lookup failed: {str(e)}"
+                    return market_id, None
+
+        tokens: Dict[str, str] = {}
+        for market_id, market in await asyncio.gather(*(resolve(m) for m in dict.fromkeys(market_ids))):
+            if market_id in errors:
+                continue
+            if not market or not market.clob_token_ids:
+                errors[market_id] = "Snapshot not available for this market"
+                continue
+            # Use the first token ID (usually the "Yes" outcome)
+            tokens[market_id] = market.clob_token_ids[0]
+
+        token_ids = list(dict.fromkeys(tokens.values()))
+        books: Dict[str, OrderBook] = {}
+        for token_id in token_ids:
+            book = self.mirror.get_book(token_id) if self.mirror else None
+            if book is None:
+                if self.mirror:
+                    self.mirror.watch(token_id)
+                book = self.book_cache.get(token_id)
+            if book is not None:
+                books[token_id] = book
+        remote = [t for t in token_ids if t not in books]
+
+        chunks = [remote[i:i + settings.CLOB_BATCH_SIZE] for i in range(0, len(remote), settings.CLOB_BATCH_SIZE)]
+
+        async def fetch(chunk):
+            async with semaphore:
+                return await self.get_books(chunk)
+
+        results = await asyncio.gather(*(fetch(chunk) for chunk in chunks), return_exceptions=True)
+
+        failed: Dict[str, str] = {}
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                for token_id in chunk:
+                    failed[token_id] = f"CLOB request failed: {str(result)}"
+                continue
+            for token_id, book in result.items():
+                self.book_cache.set(token_id, book)
+            books.update(result)
+
+        snapshots: Dict[str, MarketSnapshot] = {}
+        for market_id, token_id in tokens.items():
+            if token_id in failed:
+                errors[market_id] = failed[token_id]
+            elif token_id not in books:
+                errors[market_id] = "Order book not available for this market"
+            else:
+                book = books[token_id]
+                midpoint = book.midpoint or 0
+                snapshots[market_id] = self._build_snapshot(
+                    market_id, token_id, self._last_price(token_id, book) or midpoint, midpoint, book
+                )
+        return snapshots, errors
+
+    async def get_books(self, token_ids: List[str]) -> Dict[str, OrderBook]:
+        resp = await self.http.post("/books", json=[{"token_id": t} for t in token_ids])
+        resp.raise_for_status()
+        return {str(item.get("asset_id")): OrderBook.from_json(item) for item in resp.json()}
+
+    def _build_snapshot(
+        self,
+        market_id: str,
+        token_id: str,
+        price: float,
+        midpoint: float,
+        book: OrderBook
+    ) -> MarketSnapshot:
+        bid_top = book.best_bid
+        ask_top = book.best_ask
+        spread = (ask_top - bid_top) if (ask_top and bid_top) else 0
+
+        return MarketSnapshot(
+            market_id=market_id,
+            price=price,
+            midpoint=midpoint,
+            bid_top=bid_top,
+            ask_top=ask_top,
+            spread=spread,
+            depth_ladders={
+                "bids": book.bids.levels(50),
+                "asks": book.asks.levels(50)
+            },
+            timestamp=datetime.now(),
+            token_id=token_id
+        )
 
     async def get_timeseries(
-        self, 
-        token_id: str, 
-        interval: str = "1h", 
+        self,
+        token_id: str,
+        interval: str = "1h",
         lookback_days: int = 30
     ) -> List[TimeseriesPoint]:
-        async with httpx.AsyncClient() as client:
-            params = {
-                "market": token_id,
-                "interval": interval,
-                "fidelity": 60 if interval == "1h" else 1440 # 60 mins for 1h, 1440 mins for 1d
-            }
-            # Optional: add startTs if needed
-            
-            resp = await client.get(f"{self.base_url}/prices-history", params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            history = []
-            # Polymarket prices-history usually returns list of {t: timestamp, p: price}
-            for item in data:
-                history.append(TimeseriesPoint(
-                    timestamp=datetime.fromtimestamp(item["t"]).isoformat() if isinstance(item["t"], (int, float)) else str(item["t"]),
-                    price=float(item["p"])
-                ))
-            return history
+        ts, px = await self.get_price_history(token_id, interval, lookback_days)
+        return [
+            TimeseriesPoint(timestamp=datetime.fromtimestamp(t).isoformat(), price=round(p, 6))
+            for t, p in zip(ts.tolist(), px.tolist())
+        ]
+
+    async def get_timeseries_columns(
+        self,
+        token_id: str,
+        interval: str = "1h",
+        lookback_days: int = 30
+    ) -> Dict[str, np.ndarray]:
+        # Columnar get_timeseries(): epoch seconds and prices, no per-point objects
+        ts, px = await self.get_price_history(token_id, interval, lookback_days)
+        return {"timestamps": np.ascontiguousarray(ts), "prices": np.ascontiguousarray(px)}
+
+    async def get_price_history(
+        self,
+        token_id: str,
+        interval: str = "1h",
+        lookback_days: int = 30
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Price history as (epoch seconds int64, price float32) arrays, served from
+        the on-disk store. Upstream is only asked for points newer than the last
+        stored timestamp, at most once per PRICE_HISTORY_REFRESH seconds.
+        """
+        fidelity = 60 if interval == "1h" else 1440 # 60 mins for 1h, 1440 mins for 1d
+        now = int(time.time())
+        start_ts = now - lookback_days * 86400
+
+        # Store calls do file I/O (and wait on other processes' locks); keep them off the loop
+        meta = await asyncio.to_thread(price_history.meta, token_id, fidelity)
+        if meta is None or start_ts < meta.get("start_ts", now):
+            # Nothing stored yet, or the window reaches further back than what is stored
+            ts, px = await self._fetch_price_history(token_id, fidelity, start_ts, now)
+            await asyncio.to_thread(price_history.replace, token_id, fidelity, ts, px, start_ts)
+        elif now - meta.get("fetched_at", 0) > settings.PRICE_HISTORY_REFRESH:
+            last_ts = await asyncio.to_thread(price_history.last_timestamp, token_id, fidelity)
+            ts, px = await self._fetch_price_history(token_id, fidelity, (last_ts or start_ts) + 1, now)
+            await asyncio.to_thread(price_history.append, token_id, fidelity, ts, px)
+
+        return await asyncio.to_thread(price_history.window, token_id, fidelity, start_ts)
+
+    async def get_price_histories(
+        self,
+        token_ids: List[str],
+        interval: str = "1h",
+        lookback_days: int = 30,
+        concurrency: int = 16,
+        timeout: Optional[float] = None
+    ) -> Tuple[Dict[str, Tuple[np.ndarray, np.ndarray]], List[str]]:
+        """
+        Price histories for many tokens, fetched with bounded concurrency.
+        Returns (histories by token id with float64 prices, token ids not
+        ready within `timeout`). Late fetches keep running so they land in
+        the store for the next call.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(token_id: str):
+            async with semaphore:
+                return await self.get_price_history(token_id, interval, lookback_days)
+
+        tasks = {asyncio.create_task(fetch(t)): t for t in dict.fromkeys(token_ids)}
+        if not tasks:
+            return {}, []
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            self._background.add(task)
+            task.add_done_callback(self._discard_background)
+
+        histories = {}
+        for task in done:
+            if task.exception() is not None:
+                print(f"Price history error for {tasks[task]}: {str(task.exception())}")
+                continue
+            ts, px = task.result()
+            histories[tasks[task]] = (ts, px.astype(np.float64))
+        return histories, [tasks[task] for task in pending]
+
+    def _discard_background(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Price history error: {str(task.exception())}")
+
+    async def _fetch_price_history(
+        self,
+        token_id: str,
+        fidelity: int,
+        start_ts: int,
+        end_ts: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        params = {
+            "market": token_id,
+            "fidelity": fidelity,
+            "startTs": start_ts,
+            "endTs": end_ts
+        }
+        resp = await self.http.get("/prices-history", params=params)
+        resp.raise_for_status()
+        data = resp.json()
+
+        # Polymarket prices-history returns {history: [{t: timestamp, p: price}]} (older deployments a bare list)
+        items = data.get("history", []) if isinstance(data, dict) else data
+        ts = np.fromiter((int(item["t"]) for item in items), dtype=np.int64, count=len(items))
+        px = np.fromiter((float(item["p"]) for item in items), dtype=np.float32, count=len(items))
+        order = np.argsort(ts, kind="stable")
+        return ts[order], px[order]
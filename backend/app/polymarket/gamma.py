@@ -1,21 +1,88 @@
 import httpx
-from typing import List, Optional, Dict, Any
+import json
+from typing import List, Optional, Dict, Any, TYPE_CHECKING
 from app.config import get_settings
 from app.models import Event, Market
+from app.polymarket.transport import transport
+from app.storage.cache import TTLCache
+
+if TYPE_CHECKING:
+    from app.polymarket.catalog import CatalogIndex
 
 settings = get_settings()
 
+def _json_list(value: Any) -> List[str]:
+    # Gamma encodes outcomes/outcomePrices/clobTokenIds as JSON strings
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    return [str(v) for v in value] if isinstance(value, list) else []
+
+def parse_event(item: Dict[str, Any]) -> Event:
+    return Event(
+        id=str(item.get("id")),
+        title=item.get("title", ""),
+        description=item.get("description"),
+        active=item.get("active", True),
+        closed=item.get("closed", False),
+        volume=float(item.get("volume") or 0),
+        liquidity=float(item.get("liquidity") or 0),
+        end_date=item.get("endDate") or "",
+        image_url=item.get("image"),
+        markets_count=len(item.get("markets") or []),
+        category=item.get("category")
+    )
+
+def parse_market(item: Dict[str, Any]) -> Market:
+    return Market(
+        id=str(item.get("id")),
+        question=item.get("question", ""),
+        description=item.get("description"),
+        outcomes=_json_list(item.get("outcomes")),
+        outcome_prices=_json_list(item.get("outcomePrices")),
+        active=item.get("active", True),
+        closed=item.get("closed", False),
+        volume=float(item.get("volume") or 0),
+        liquidity=float(item.get("liquidity") or 0),
+        end_date=item.get("endDate"),
+        image_url=item.get("image"),
+        group_id=str(item.get("group_id")) if item.get("group_id") else None,
+        clob_token_ids=_json_list(item.get("clobTokenIds")) or None
+    )
+
 class GammaClient:
-    def __init__(self):
+    """
+    Gamma metadata client. When a synced catalog index is attached and
+    fresh, lookups are answered locally; otherwise (or on an index miss)
+    they go upstream through the TTL cache.
+    """
+    def __init__(self, catalog: Optional["CatalogIndex"] = None):
         self.base_url = settings.POLYMARKET_GAMMA_URL
+        self.catalog = catalog
+        # Market/event metadata barely changes; share lookups across callers
+        self.cache = TTLCache(maxsize=settings.MARKET_CACHE_SIZE, ttl=settings.MARKET_CACHE_TTL)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return transport.gamma
+
+    def _local(self) -> Optional["CatalogIndex"]:
+        return self.catalog if self.catalog is not None and self.catalog.is_fresh() else None
 
     async def list_events(
-        self, 
-        limit: int = 50, 
-        offset: int = 0, 
-        status: str = "active", 
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        status: str = "active",
         search: Optional[str] = None
     ) -> List[Event]:
+        catalog = self._local()
+        if catalog and status == "active":
+            # The catalog holds every active event
+            return catalog.list_events(limit, offset, search)
+
         params = {
             "limit": limit,
             "offset": offset,
@@ -25,122 +92,59 @@ class GammaClient:
         if search:
             params["search"] = search
 
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/events", params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            events = []
-            for item in data:
-                events.append(Event(
-                    id=str(item.get("id")),
-                    title=item.get("title", ""),
-                    description=item.get("description"),
-                    active=item.get("active", True),
-                    closed=item.get("closed", False),
-                    volume=float(item.get("volume", 0)),
-                    liquidity=float(item.get("liquidity", 0)),
-                    end_date=item.get("endDate", ""),
-                    image_url=item.get("image"),
-                    markets_count=len(item.get("markets", [])),
-                    category=item.get("category")
-                ))
-            return events
+        resp = await self.http.get("/events", params=params)
+        resp.raise_for_status()
+        return [parse_event(item) for item in resp.json()]
 
     async def get_event(self, event_id: str) -> Optional[Event]:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/events/{event_id}")
-            if resp.status_code == 404:
-                return None
-            resp.raise_for_status()
-            item = resp.json()
-            
-            return Event(
-                id=str(item.get("id")),
-                title=item.get("title", ""),
-                description=item.get("description"),
-                active=item.get("active", True),
-                closed=item.get("closed", False),
-                volume=float(item.get("volume", 0)),
-                liquidity=float(item.get("liquidity", 0)),
-                end_date=item.get("endDate", ""),
-                image_url=item.get("image"),
-                markets_count=len(item.get("markets", [])),
-                category=item.get("category")
-            )
+        catalog = self._local()
+        if catalog:
+            event = catalog.get_event(event_id)
+            if event:
+                return event
+        return await self.cache.get_or_load(("event", event_id), lambda: self._fetch_event(event_id))
+
+    async def _fetch_event(self, event_id: str) -> Optional[Event]:
+        resp = await self.http.get(f"/events/{event_id}")
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return parse_event(resp.json())
 
     async def get_event_markets(self, event_id: str) -> List[Market]:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/events/{event_id}")
-            resp.raise_for_status()
-            data = resp.json()
-            
-            markets = []
-            for item in data.get("markets", []):
-                markets.append(Market(
-                    id=str(item.get("id")),
-                    question=item.get("question", ""),
-                    description=item.get("description"),
-                    outcomes=item.get("outcomes", []),
-                    outcome_prices=item.get("outcomePrices", []),
-                    active=item.get("active", True),
-                    closed=item.get("closed", False),
-                    volume=float(item.get("volume", 0)),
-                    liquidity=float(item.get("liquidity", 0)),
-                    end_date=item.get("endDate"),
-                    image_url=item.get("image"),
-                    group_id=str(item.get("group_id")) if item.get("group_id") else None,
-                    clob_token_ids=item.get("clobTokenIds")
-                ))
-            return markets
+        catalog = self._local()
+        if catalog and catalog.get_event(event_id):
+            return catalog.get_event_markets(event_id)
+        return await self.cache.get_or_load(("event_markets", event_id), lambda: self._fetch_event_markets(event_id))
+
+    async def _fetch_event_markets(self, event_id: str) -> List[Market]:
+        resp = await self.http.get(f"/events/{event_id}")
+        resp.raise_for_status()
+        return [parse_market(item) for item in resp.json().get("markets", [])]
 
     async def get_market(self, market_id: str) -> Optional[Market]:
+        catalog = self._local()
+        if catalog:
+            market = catalog.get_market(market_id)
+            if market:
+                return market
+        return await self.cache.get_or_load(("market", market_id), lambda: self._fetch_market(market_id))
+
+    async def _fetch_market(self, market_id: str) -> Optional[Market]:
         # Gamma markets endpoint is /markets?id=...
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/markets", params={"id": market_id})
-            resp.raise_for_status()
-            data = resp.json()
-            if not data:
-                return None
-            item = data[0]
-            
-            return Market(
-                id=str(item.get("id")),
-                question=item.get("question", ""),
-                description=item.get("description"),
-                outcomes=item.get("outcomes", []),
-                outcome_prices=item.get("outcomePrices", []),
-                active=item.get("active", True),
-                closed=item.get("closed", False),
-                volume=float(item.get("volume", 0)),
-                liquidity=float(item.get("liquidity", 0)),
-                end_date=item.get("endDate"),
-                image_url=item.get("image"),
-                group_id=str(item.get("group_id")) if item.get("group_id") else None,
-                clob_token_ids=item.get("clobTokenIds")
-            )
-
-    async def search_markets(self, query: str) -> List[Market]:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/markets", params={"search": query, "active": "true"})
-            resp.raise_for_status()
-            data = resp.json()
-            
-            markets = []
-            for item in data:
-                markets.append(Market(
-                    id=str(item.get("id")),
-                    question=item.get("question", ""),
-                    description=item.get("description"),
-                    outcomes=item.get("outcomes", []),
-                    outcome_prices=item.get("outcomePrices", []),
-                    active=item.get("active", True),
-                    closed=item.get("closed", False),
-                    volume=float(item.get("volume", 0)),
-                    liquidity=float(item.get("liquidity", 0)),
-                    end_date=item.get("endDate"),
-                    image_url=item.get("image"),
-                    group_id=str(item.get("group_id")) if item.get("group_id") else None,
-                    clob_token_ids=item.get("clobTokenIds")
-                ))
-            return markets
+        resp = await self.http.get("/markets", params={"id": market_id})
+        resp.raise_for_status()
+        data = resp.json()
+        if not data:
+            return None
+        return parse_market(data[0])
+
+    async def search_markets(self, query: str, limit: int = 20) -> List[Market]:
+        catalog = self._local()
+        if catalog:
+            # Ranked, typo-tolerant local search; no upstream round trip per keystroke
+            return catalog.search_markets(query, limit)
+
+        resp = await self.http.get("/markets", params={"search": query, "active": "true", "limit": limit})
+        resp.raise_for_status()
+        return [parse_market(item) for item in resp.json()]
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import time
+import numpy as np
+import websockets
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+from app.config import get_settings
+from app.polymarket.book import OrderBook
+
+settings = get_settings()
+
+class MirroredBook:
+    """
+    In-memory copy of one token's book, kept current by websocket deltas.
+    Levels are stored as price -> size maps; the array-backed OrderBook is
+    rebuilt lazily only after a change.
+    """
+    def __init__(self, token_id: str):
+        self.token_id = token_id
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.last_trade_price: Optional[float] = None
+        self.seq: Optional[int] = None
+        self.timestamp: int = 0
+        self.synced = False
+        self._book: Optional[OrderBook] = None
+
+    def apply_snapshot(self, msg: Dict[str, Any]):
+        self.bids = {float(l["price"]): float(l["size"]) for l in msg.get("bids", [])}
+        self.asks = {float(l["price"]): float(l["size"]) for l in msg.get("asks", [])}
+        self.seq = msg.get("seq")
+        self.timestamp = int(msg.get("timestamp") or 0)
+        self.synced = True
+        self._book = None
+
+    def apply_change(self, side: str, price: float, size: float):
+        levels = self.bids if side.upper() in ("BUY", "BID") else self.asks
+        if size <= 0:
+            levels.pop(price, None)
+        else:
+            levels[price] = size
+        self._book = None
+
+    def check_sequence(self, msg: Dict[str, Any]) -> bool:
+        """
+        Returns False when the message reveals a gap and the book must be resynced.
+        Messages carrying `seq` must be contiguous; otherwise timestamps must not go backwards.
+        """
+        seq = msg.get("seq")
+        if seq is not None and self.seq is not None:
+            if seq != self.seq + 1:
+                return False
+            self.seq = seq
+        elif seq is not None:
+            self.seq = seq
+
+        timestamp = int(msg.get("timestamp") or 0)
+        if timestamp and timestamp < self.timestamp:
+            return False
+        self.timestamp = max(self.timestamp, timestamp)
+        return True
+
+    def to_book(self) -> OrderBook:
+        if self._book is None:
+            bids = np.array(list(self.bids.items()), dtype=np.float64).reshape(-1, 2)
+            asks = np.array(list(self.asks.items()), dtype=np.float64).reshape(-1, 2)
+            self._book = OrderBook(bids[:, 0], bids[:, 1], asks[:, 0], asks[:, 1])
+        return self._book
+
+class BookMirror:
+    """
+    Live order-book mirror fed by the CLOB market websocket channel.
+
+    Tokens are subscribed on demand via `watch`; at most BOOK_MIRROR_MAX_TOKENS
+    are kept, evicting the least recently read. A sequence gap or out-of-order
+    message marks the book unsynced and re-subscribes the token, which makes
+    the server send a fresh `book` snapshot.
+    """
+    def __init__(self, url: Optional[str] = None):
+        self.url = url or settings.CLOB_WS_URL
+        self.max_age = settings.BOOK_MIRROR_MAX_AGE
+        self.books: "OrderedDict[str, MirroredBook]" = OrderedDict()
+        self._ws = None
+        self._task: Optional[asyncio.Task] = None
+        self._ping_task: Optional[asyncio.Task] = None
+        self._last_message_at = 0.0
+        self._pending: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.messages = 0
+        self.resyncs = 0
+
+    # --- Public API ---
+
+    def watch(self, token_id: str):
+        if token_id in self.books:
+            self.books.move_to_end(token_id)
+            return
+        self.books[token_id] = MirroredBook(token_id)
+        self._send({"assets_ids": [token_id], "operation": "subscribe"})
+
+        while len(self.books) > settings.BOOK_MIRROR_MAX_TOKENS:
+            evicted, _ = self.books.popitem(last=False)
+            self._send({"assets_ids": [evicted], "operation": "unsubscribe"})
+
+    def is_fresh(self, token_id: str) -> bool:
+        book = self.books.get(token_id)
+        if not book or not book.synced or self._ws is None:
+            return False
+        # Quiet markets send no deltas; connection liveness (pings) keeps them fresh
+        return time.monotonic() - self._last_message_at < self.max_age
+
+    def get_book(self, token_id: str) -> Optional[OrderBook]:
+        if not self.is_fresh(token_id):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.books.move_to_end(token_id)
+        return self.books[token_id].to_book()
+
+    def get_last_trade_price(self, token_id: str) -> Optional[float]:
+        book = self.books.get(token_id)
+        return book.last_trade_price if book else None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        for task in (self._ping_task, self._task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._task = self._ping_task = None
+        self._ws = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self._ws is not None,
+            "tokens": len(self.books),
+            "synced": sum(1 for b in self.books.values() if b.synced),
+            "hits": self.hits,
+            "misses": self.misses,
+            "messages": self.messages,
+            "resyncs": self.resyncs
+        }
+
+    # --- Connection handling ---
+
+    def _send(self, *payloads: Dict[str, Any]):
+        if self._ws is None:
+            # Subscribed in bulk on (re)connect
+            return
+        task = asyncio.create_task(self._safe_send(self._ws, payloads))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _safe_send(self, ws, payloads):
+        try:
+            for payload in payloads:
+                await ws.send(json.dumps(payload))
+        except Exception as e:
+            print(f"Book mirror send error: {str(e)}")
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=None) as ws:
+                    self._ws = ws
+                    backoff = 1.0
+                    for book in self.books.values():
+                        book.synced = False
+                    await ws.send(json.dumps({"assets_ids": list(self.books), "type": "market"}))
+                    self._ping_task = asyncio.create_task(self._ping(ws))
+
+                    async for raw in ws:
+                        self._last_message_at = time.monotonic()
+                        if raw == "PONG":
+                            continue
+                        self._handle(json.loads(raw))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Book mirror connection error: {str(e)}")
+            finally:
+                self._ws = None
+                if self._ping_task:
+                    self._ping_task.cancel()
+                    self._ping_task = None
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(settings.BOOK_MIRROR_PING_INTERVAL)
+            await ws.send("PING")
+
+    # --- Message handling ---
+
+    def _handle(self, msg: Any):
+        # The market channel may batch several events into one frame
+        if isinstance(msg, list):
+            for m in msg:
+                self._handle(m)
+            return
+
+        self.messages += 1
+        event_type = msg.get("event_type")
+        if event_type == "book":
+            book = self.books.get(msg.get("asset_id"))
+            if book:
+                book.apply_snapshot(msg)
+        elif event_type == "price_change":
+            self._handle_price_change(msg)
+        elif event_type == "last_trade_price":
+            book = self.books.get(msg.get("asset_id"))
+            if book:
+                book.last_trade_price = float(msg["price"])
+
+    def _handle_price_change(self, msg: Dict[str, Any]):
+        # Older frames carry one asset with `changes`; newer ones carry `price_changes` across assets
+        changes: List[Dict[str, Any]] = msg.get("price_changes") or [
+            dict(c, asset_id=msg.get("asset_id")) for c in msg.get("changes", [])
+        ]
+        checked = set()
+        for change in changes:
+            book = self.books.get(change.get("asset_id"))
+            if not book or not book.synced:
+                continue
+            if book.token_id not in checked:
+                checked.add(book.token_id)
+                if not book.check_sequence(msg):
+                    self._resync(book)
+                    continue
+            book.apply_change(change["side"], float(change["price"]), float(change["size"]))
+
+    def _resync(self, book: MirroredBook):
+        self.resyncs += 1
+        book.synced = False
+        self._send(
+            {"assets_ids": [book.token_id], "operation": "unsubscribe"},
+            {"assets_ids": [book.token_id], "operation": "subscribe"}
+        )
@@ -0,0 +1,138 @@
+"""
+Local stand-in for the CLOB market websocket channel.
+
+Speaks the subset of the protocol BookMirror relies on (initial/dynamic
+subscriptions, `book` snapshots, sequenced `price_change` deltas,
+`last_trade_price`, PING/PONG) so the mirror can be exercised without
+upstream access:
+
+    python -m app.polymarket.mirror_stub --port 8765
+    CLOB_WS_URL=ws://localhost:8765 BOOK_MIRROR_ENABLED=true uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import websockets
+from typing import Dict, List, Set
+
+class StubMarketServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.books: Dict[str, Dict[str, Dict[float, float]]] = {}
+        self.seq: Dict[str, int] = {}
+        self.clients: Dict[object, Set[str]] = {}
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def set_book(self, token_id: str, bids: List[List[float]], asks: List[List[float]]):
+        self.books[token_id] = {
+            "bids": {float(p): float(s) for p, s in bids},
+            "asks": {float(p): float(s) for p, s in asks},
+        }
+        self.seq.setdefault(token_id, 0)
+
+    async def publish_change(self, token_id: str, side: str, price: float, size: float, skip_seq: bool = False):
+        """Apply a level change and broadcast it; `skip_seq` simulates a dropped message."""
+        levels = self.books[token_id]["bids" if side == "BUY" else "asks"]
+        if size <= 0:
+            levels.pop(price, None)
+        else:
+            levels[price] = size
+        self.seq[token_id] += 2 if skip_seq else 1
+
+        await self._broadcast(token_id, {
+            "event_type": "price_change",
+            "asset_id": token_id,
+            "changes": [{"price": str(price), "side": side, "size": str(size)}],
+            "seq": self.seq[token_id],
+            "timestamp": str(int(time.time() * 1000))
+        })
+
+    async def publish_trade(self, token_id: str, price: float):
+        await self._broadcast(token_id, {
+            "event_type": "last_trade_price",
+            "asset_id": token_id,
+            "price": str(price),
+            "timestamp": str(int(time.time() * 1000))
+        })
+
+    def _snapshot(self, token_id: str) -> Dict:
+        book = self.books.setdefault(token_id, {"bids": {}, "asks": {}})
+        return {
+            "event_type": "book",
+            "asset_id": token_id,
+            "bids": [{"price": str(p), "size": str(s)} for p, s in sorted(book["bids"].items())],
+            "asks": [{"price": str(p), "size": str(s)} for p, s in sorted(book["asks"].items(), reverse=True)],
+            "seq": self.seq.setdefault(token_id, 0),
+            "timestamp": str(int(time.time() * 1000))
+        }
+
+    async def _broadcast(self, token_id: str, msg: Dict):
+        payload = json.dumps(msg)
+        for ws, tokens in list(self.clients.items()):
+            if token_id in tokens:
+                try:
+                    await ws.send(payload)
+                except websockets.ConnectionClosed:
+                    pass
+
+    async def _handler(self, ws):
+        tokens: Set[str] = set()
+        self.clients[ws] = tokens
+        try:
+            async for raw in ws:
+                if raw == "PING":
+                    await ws.send("PONG")
+                    continue
+                msg = json.loads(raw)
+                assets = msg.get("assets_ids", [])
+                if msg.get("operation") == "unsubscribe":
+                    tokens.difference_update(assets)
+                    continue
+                tokens.update(assets)
+                if assets:
+                    await ws.send(json.dumps([self._snapshot(t) for t in assets]))
+        finally:
+            self.clients.pop(ws, None)
+
+async def _serve(port: int, tokens: List[str]):
+    server = StubMarketServer(host="0.0.0.0", port=port)
+    await server.start()
+    print(f"Stub CLOB market channel listening on {server.url}")
+
+    # Random-walk the given tokens so watched books keep moving
+    for token_id in tokens:
+        server.set_book(
+            token_id,
+            bids=[[round(0.50 - i / 100, 2), 1000.0] for i in range(1, 20)],
+            asks=[[round(0.50 + i / 100, 2), 1000.0] for i in range(1, 20)]
+        )
+    while True:
+        await asyncio.sleep(0.5)
+        for token_id in tokens:
+            side = random.choice(["BUY", "SELL"])
+            offset = random.randint(1, 19) / 100
+            price = round(0.50 - offset if side == "BUY" else 0.50 + offset, 2)
+            await server.publish_change(token_id, side, price, float(random.randint(0, 5000)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("tokens", nargs="*", help="token ids to seed and random-walk")
+    args = parser.parse_args()
+    asyncio.run(_serve(args.port, args.tokens))
@@ -0,0 +1,232 @@
+import bisect
+import heapq
+import math
+import re
+import numpy as np
+from typing import Dict, List, Optional, Set, Tuple
+from app.models import Market
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or the this to was will with".split()
+)
+
+# Field weights (BM25F-style): a question hit counts more than a description hit
+FIELD_WEIGHTS = (("question", 1.0), ("event", 0.6), ("description", 0.2))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+POPULARITY_WEIGHT = 0.3 # share of the final score from volume/liquidity
+PREFIX_PENALTY = 0.8
+FUZZY_PENALTY = 0.6
+MAX_EXPANSIONS = 16 # prefix/fuzzy terms considered per query token
+MIN_FUZZY_LENGTH = 4
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return [t for t in WORD_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+def _deletes(term: str) -> Set[str]:
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Levenshtein distance <= 1, plus adjacent transpositions."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        return len(diff) == 1 or (
+            len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+        )
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+class MarketSearchIndex:
+    """
+    Inverted index over market questions, descriptions and event titles.
+
+    - Exact terms are scored with BM25 over field-weighted term frequencies.
+    - The last query token also matches as a prefix (type-ahead), via
+      bisect on a sorted vocabulary.
+    - Tokens with no exact match fall back to fuzzy matches within one edit,
+      found through a deletion neighbourhood (SymSpell) rather than a
+      vocabulary scan.
+    - Text relevance is blended with log-scaled volume and liquidity.
+
+    Markets are added, replaced and removed one at a time as the catalog
+    changes.
+    """
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {} # term -> (docs, tfs), built on demand
+        self.vocabulary: List[str] = []
+        self.deletes: Dict[str, Set[str]] = {}
+        self.doc_ids: Dict[str, int] = {}
+        self.markets: List[Optional[Market]] = []
+        self.doc_terms: List[Dict[str, float]] = []
+        self._free: List[int] = []
+        self.lengths = np.zeros(0)
+        self.volume = np.zeros(0)
+        self.liquidity = np.zeros(0)
+        self.total_length = 0.0
+        self.count = 0
+
+    # --- Updates ---
+
+    def upsert(self, market: Market, event_title: Optional[str] = None):
+        self.remove(market.id)
+
+        terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            text = market.question if field == "question" else event_title if field == "event" else market.description
+            for term in _tokens(text):
+                terms[term] = terms.get(term, 0.0) + weight
+        if not terms:
+            return
+
+        doc = self._allocate()
+        self.doc_ids[market.id] = doc
+        self.markets[doc] = market
+        self.doc_terms[doc] = terms
+        length = sum(terms.values())
+        self.lengths[doc] = length
+        self.volume[doc] = math.log1p(max(market.volume, 0.0))
+        self.liquidity[doc] = math.log1p(max(market.liquidity, 0.0))
+        self.total_length += length
+        self.count += 1
+
+        for term, tf in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+                if len(term) >= MIN_FUZZY_LENGTH:
+                    for variant in _deletes(term):
+                        self.deletes.setdefault(variant, set()).add(term)
+            posting[doc] = tf
+            self._arrays.pop(term, None)
+
+    def remove(self, market_id: str):
+        doc = self.doc_ids.pop(market_id, None)
+        if doc is None:
+            return
+        for term in self.doc_terms[doc]:
+            posting = self.postings[term]
+            posting.pop(doc, None)
+            self._arrays.pop(term, None)
+            if not posting:
+                del self.postings[term]
+                self.vocabulary.pop(bisect.bisect_left(self.vocabulary, term))
+                if len(term) >= MIN_FUZZY_LENGTH:
+                    for variant in _deletes(term):
+                        neighbours = self.deletes.get(variant)
+                        if neighbours is not None:
+                            neighbours.discard(term)
+                            if not neighbours:
+                                del self.deletes[variant]
+        self.total_length -= self.lengths[doc]
+        self.count -= 1
+        self.markets[doc] = None
+        self.doc_terms[doc] = {}
+        self.lengths[doc] = self.volume[doc] = self.liquidity[doc] = 0.0
+        self._free.append(doc)
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        doc = len(self.markets)
+        self.markets.append(None)
+        self.doc_terms.append({})
+        if doc >= len(self.lengths):
+            grow = max(1024, len(self.lengths))
+            self.lengths = np.concatenate([self.lengths, np.zeros(grow)])
+            self.volume = np.concatenate([self.volume, np.zeros(grow)])
+            self.liquidity = np.concatenate([self.liquidity, np.zeros(grow)])
+        return doc
+
+    # --- Queries ---
+
+    def _expand(self, token: str, prefix: bool) -> List[Tuple[str, float]]:
+        """Index terms a query token stands for, with their match penalty."""
+        matches: Dict[str, float] = {}
+        if token in self.postings:
+            matches[token] = 1.0
+        if prefix:
+            start = bisect.bisect_left(self.vocabulary, token)
+            end = bisect.bisect_left(self.vocabulary, token + "\uffff", start)
+            candidates = [t for t in self.vocabulary[start:end] if t != token]
+            # Most common completions first, so a short prefix stays cheap and useful
+            for term in heapq.nlargest(MAX_EXPANSIONS, candidates, key=lambda t: len(self.postings[t])):
+                matches[term] = PREFIX_PENALTY
+        if not matches and len(token) >= MIN_FUZZY_LENGTH:
+            candidates = set(self.deletes.get(token, ()))
+            for variant in _deletes(token):
+                if variant in self.postings:
+                    candidates.add(variant)
+                candidates |= self.deletes.get(variant, set())
+            fuzzy = [t for t in candidates if _within_one_edit(token, t)]
+            for term in heapq.nlargest(MAX_EXPANSIONS, fuzzy, key=lambda t: len(self.postings[t])):
+                matches[term] = FUZZY_PENALTY
+        return list(matches.items())
+
+    def search(self, query: str, limit: int = 20) -> List[Market]:
+        tokens = list(dict.fromkeys(_tokens(query)))
+        if not tokens or not self.count:
+            return []
+
+        avg_length = self.total_length / self.count
+        size = len(self.markets)
+        groups: List[np.ndarray] = []
+        for i, token in enumerate(tokens):
+            scores = np.zeros(size)
+            for term, penalty in self._expand(token, prefix=i == len(tokens) - 1):
+                docs, tfs = self._posting_arrays(term)
+                idf = math.log(1 + (self.count - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[docs] / avg_length)
+                # A token matched by several expansions counts its best one
+                scores[docs] = np.maximum(scores[docs], penalty * idf * tfs * (BM25_K1 + 1) / (tfs + norm))
+            if scores.any():
+                groups.append(scores)
+        if not groups:
+            return []
+
+        stacked = np.vstack(groups)
+        # Markets matching every token; if none do, rank by any match
+        docs = np.flatnonzero((stacked > 0).all(axis=0))
+        if not docs.size:
+            docs = np.flatnonzero((stacked > 0).any(axis=0))
+
+        text = stacked[:, docs].sum(axis=0)
+        text /= text.max() or 1.0
+        popularity = (
+            0.7 * self.volume[docs] / (self.volume.max() or 1.0)
+            + 0.3 * self.liquidity[docs] / (self.liquidity.max() or 1.0)
+        )
+        final = (1 - POPULARITY_WEIGHT) * text + POPULARITY_WEIGHT * popularity
+
+        if len(docs) > limit:
+            top = np.argpartition(-final, limit)[:limit]
+        else:
+            top = np.arange(len(docs))
+        top = top[np.argsort(-final[top], kind="stable")]
+        return [self.markets[int(docs[i])] for i in top]
+
+    def _posting_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            posting = self.postings[term]
+            arrays = self._arrays[term] = (
+                np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                np.fromiter(posting.values(), dtype=np.float64, count=len(posting))
+            )
+        return arrays
+
+    def stats(self) -> Dict[str, int]:
+        return {"markets": self.count, "terms": len(self.postings)}
@@ -0,0 +1,72 @@
+import httpx
+from typing import Dict
+from app.config import get_settings
+
+settings = get_settings()
+
+class Transport:
+    """
+    Long-lived, keep-alive HTTP connection pools, one per upstream.
+    Started and closed by the FastAPI lifespan in app.main and shared by
+    every Gamma/CLOB client so requests reuse warm TCP/TLS connections.
+    """
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._base_urls = {
+            "gamma": settings.POLYMARKET_GAMMA_URL,
+            "clob": settings.POLYMARKET_CLOB_URL,
+        }
+
+    def _build(self, name: str) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            settings.HTTP_TIMEOUT,
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+            pool=settings.HTTP_POOL_TIMEOUT,
+        )
+        http2 = settings.HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("h2 not installed, falling back to HTTP/1.1 keep-alive")
+                http2 = False
+
+        return httpx.AsyncClient(
+            base_url=self._base_urls[name],
+            limits=limits,
+            timeout=timeout,
+            http2=http2,
+        )
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        # Lazily create the pool so scripts and workers outside the app lifespan still work
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build(name)
+            self._clients[name] = client
+        return client
+
+    async def start(self):
+        for name in self._base_urls:
+            self.get(name)
+
+    async def close(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    @property
+    def gamma(self) -> httpx.AsyncClient:
+        return self.get("gamma")
+
+    @property
+    def clob(self) -> httpx.AsyncClient:
+        return self.get("clob")
+
+# Singleton instance
+transport = Transport()
@@ -0,0 +1,151 @@
+import asyncio
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from app.config import get_settings
+
+settings = get_settings()
+
+HOUR = 3600
+
+def align_prices(histories: List[Tuple[np.ndarray, np.ndarray]], grid: np.ndarray) -> np.ndarray:
+    """
+    Sample each (timestamps, prices) history onto a shared time grid, carrying
+    the last observed price forward. Returns a (len(grid), n_markets) matrix,
+    NaN before a market's first observation.
+    """
+    prices = np.full((len(grid), len(histories)), np.nan)
+    for j, (ts, px) in enumerate(histories):
+        if len(ts) == 0:
+            continue
+        idx = np.searchsorted(ts, grid, side="right") - 1
+        observed = idx >= 0
+        prices[observed, j] = px[idx[observed]]
+    return prices
+
+class CoMoments:
+    """
+    Pairwise-complete co-moment sums of a (time x market) return matrix.
+
+    For every pair (i, j) the sums only cover periods where both markets
+    have a return, so markets listed at different times can still be
+    compared. All sums are matrix products over rows, so rows can be added
+    (new periods) and removed (periods leaving the window) incrementally.
+    """
+    def __init__(self, n: int):
+        self.cross = np.zeros((n, n))   # sum r_i r_j
+        self.sums = np.zeros((n, n))    # sum r_i over rows where j is valid
+        self.squares = np.zeros((n, n)) # sum r_i^2 over rows where j is valid
+        self.counts = np.zeros((n, n))  # rows where both are valid
+
+    def add(self, returns: np.ndarray, sign: float = 1.0):
+        if not len(returns):
+            return
+        valid = ~np.isnan(returns)
+        r = np.where(valid, returns, 0.0)
+        m = valid.astype(np.float64)
+        self.cross += sign * (r.T @ r)
+        self.sums += sign * (r.T @ m)
+        self.squares += sign * ((r * r).T @ m)
+        self.counts += sign * (m.T @ m)
+
+    def remove(self, returns: np.ndarray):
+        self.add(returns, sign=-1.0)
+
+    def statistics(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(correlation, covariance, variance of j over the pair's rows), NaN where undefined."""
+        n = self.counts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = (self.cross - self.sums * self.sums.T / n) / (n - 1)
+            var_i = (self.squares - self.sums ** 2 / n) / (n - 1)
+            var_j = var_i.T
+            corr = cov / np.sqrt(var_i * var_j)
+        undefined = (n < settings.HEDGE_MIN_OBSERVATIONS) | ~(var_i > 1e-12) | ~(var_j > 1e-12)
+        corr[undefined] = np.nan
+        cov[undefined] = np.nan
+        return np.clip(corr, -1.0, 1.0), cov, var_j
+
+class EventCorrelation:
+    """
+    Hourly price-change correlations for all markets of one event over a
+    rolling HEDGE_LOOKBACK_DAYS window. `refresh()` only appends the hours
+    since the last refresh and drops the hours that left the window; a full
+    rebuild happens when the market set changes or every
+    HEDGE_REBUILD_INTERVAL seconds (bounding floating-point drift).
+    """
+    def __init__(self, market_ids: List[str]):
+        self.market_ids = market_ids
+        self.index = {m: i for i, m in enumerate(market_ids)}
+        self.grid = np.zeros(0, dtype=np.int64)
+        self.prices = np.zeros((0, len(market_ids)))
+        self.returns = np.zeros((0, len(market_ids)))
+        self.moments = CoMoments(len(market_ids))
+        self.built_at = 0.0
+        self.refreshed_at = 0.0
+        self.lock = asyncio.Lock() # one refresh at a time per event
+        self._stats: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def refresh(self, histories: Dict[str, Tuple[np.ndarray, np.ndarray]], now: Optional[float] = None):
+        now = now or time.time()
+        end = int(now // HOUR) * HOUR
+        start = end - settings.HEDGE_LOOKBACK_DAYS * 86400
+        ordered = [histories.get(m, (np.zeros(0, np.int64), np.zeros(0))) for m in self.market_ids]
+
+        if not len(self.grid) or now - self.built_at > settings.HEDGE_REBUILD_INTERVAL:
+            self.grid = np.arange(start, end + 1, HOUR, dtype=np.int64)
+            self.prices = align_prices(ordered, self.grid)
+            self.returns = np.diff(self.prices, axis=0)
+            self.moments = CoMoments(len(self.market_ids))
+            self.moments.add(self.returns)
+            self.built_at = now
+        else:
+            new_grid = np.arange(self.grid[-1] + HOUR, end + 1, HOUR, dtype=np.int64)
+            if len(new_grid):
+                new_prices = align_prices(ordered, new_grid)
+                new_returns = np.diff(np.vstack([self.prices[-1:], new_prices]), axis=0)
+                self.moments.add(new_returns)
+                self.grid = np.concatenate([self.grid, new_grid])
+                self.prices = np.vstack([self.prices, new_prices])
+                self.returns = np.vstack([self.returns, new_returns])
+
+            expired = int(np.searchsorted(self.grid, start))
+            if expired:
+                # returns[k] is the move into grid[k + 1]
+                self.moments.remove(self.returns[:expired])
+                self.grid = self.grid[expired:]
+                self.prices = self.prices[expired:]
+                self.returns = self.returns[expired:]
+
+        self.refreshed_at = now
+        self._stats = None
+
+    def is_stale(self) -> bool:
+        return time.time() - self.refreshed_at > settings.HEDGE_REFRESH_INTERVAL
+
+    def invalidate(self):
+        # Next refresh rebuilds from scratch (e.g. after histories were missing)
+        self.built_at = self.refreshed_at = 0.0
+
+    def statistics(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._stats is None:
+            self._stats = self.moments.statistics()
+        return self._stats
+
+    def latest_prices(self) -> np.ndarray:
+        return self.prices[-1] if len(self.prices) else np.full(len(self.market_ids), np.nan)
+
+class CorrelationCache:
+    """Per-event EventCorrelation entries, refreshed at most every HEDGE_REFRESH_INTERVAL seconds."""
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: Dict[str, EventCorrelation] = {}
+
+    def get(self, event_id: str, market_ids: List[str]) -> Tuple[EventCorrelation, bool]:
+        """Entry for the event, and whether it needs a refresh."""
+        entry = self._entries.pop(event_id, None)
+        if entry is None or entry.market_ids != market_ids:
+            entry = EventCorrelation(market_ids)
+        self._entries[event_id] = entry
+        while len(self._entries) > self.maxsize:
+            self._entries.pop(next(iter(self._entries)))
+        return entry, entry.is_stale()
@@ -0,0 +1,253 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Optional, Set
+import numpy as np
+from app.config import get_settings
+from app.executors import ExecutorBusyError
+
+settings = get_settings()
+
+class RiskJobCancelled(Exception):
+    """Raised inside a worker when the caller abandoned the job."""
+
+class RiskJobTimeout(Exception):
+    """Raised when a risk job runs past its deadline."""
+
+class SharedArray:
+    """An array a worker left in shared memory, passed back by name instead of pickled."""
+    __slots__ = ("name", "shape", "dtype")
+
+    def __init__(self, name: str, shape: tuple, dtype: str):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+# --- Worker side ---
+
+_board = None # per-slot cancel flags shared with the parent
+_slot = -1
+_deadline: Optional[float] = None
+
+def _init_worker(board):
+    global _board
+    _board = board
+
+def _warm() -> int:
+    # Pay the imports and first-call NumPy setup before the first real job
+    import app.risk.montecarlo, app.risk.scenario, app.risk.liquidity, app.risk.portfolio # noqa: F401
+    np.random.default_rng(0).standard_normal((64, 64)).sum()
+    return os.getpid()
+
+def checkpoint():
+    """
+    Called between chunks of long computations. Raises if the job was
+    cancelled or is past its deadline; a no-op outside pool workers.
+    """
+    if _slot < 0:
+        return
+    if _board[_slot]:
+        raise RiskJobCancelled()
+    if _deadline is not None and time.time() > _deadline:
+        raise RiskJobTimeout("Risk computation exceeded its time limit")
+
+def _export(value: Any) -> Any:
+    if isinstance(value, np.ndarray) and value.nbytes >= settings.RISK_SHM_MIN_BYTES:
+        shm = shared_memory.SharedMemory(create=True, size=value.nbytes)
+        np.ndarray(value.shape, value.dtype, buffer=shm.buf)[...] = value
+        shm.close()
+        return SharedArray(shm.name, value.shape, value.dtype.str)
+    if isinstance(value, dict):
+        return {k: _export(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_export(v) for v in value)
+    return value
+
+def _run_job(slot: int, deadline: float, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    global _slot, _deadline
+    _slot, _deadline = slot, deadline
+    try:
+        checkpoint()
+        return _export(fn(*args, **kwargs))
+    finally:
+        _slot, _deadline = -1, None
+
+# --- Parent side ---
+
+def _import(value: Any, keep: bool = True) -> Any:
+    if isinstance(value, SharedArray):
+        shm = shared_memory.SharedMemory(name=value.name)
+        try:
+            return np.array(np.ndarray(value.shape, np.dtype(value.dtype), buffer=shm.buf)) if keep else None
+        finally:
+            shm.close()
+            shm.unlink()
+    if isinstance(value, dict):
+        return {k: _import(v, keep) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_import(v, keep) for v in value)
+    return value
+
+class RiskExecutor:
+    """
+    Runs CPU-bound risk computations off the event loop.
+
+    Each call carries an estimated cost (roughly the number of array cells
+    it touches). Cheap calls run inline, since a pool round trip would cost
+    more than the work. Expensive calls go to a warmed process pool sized
+    to the cores, so a large Monte Carlo run cannot stall other clients.
+
+    Pooled jobs get a deadline and a cancel flag in a shared slot board,
+    which long loops poll through checkpoint(). Large arrays in results
+    come back through shared memory rather than through the result pipe.
+    """
+    def __init__(self, max_workers: Optional[int] = None, inline_max_cost: Optional[float] = None, timeout: Optional[float] = None):
+        self.max_workers = max_workers or settings.RISK_POOL_WORKERS or os.cpu_count() or 1
+        self.inline_max_cost = inline_max_cost if inline_max_cost is not None else settings.RISK_INLINE_MAX_COST
+        self.timeout = timeout or settings.RISK_JOB_TIMEOUT
+        self.slots = self.max_workers * 2 # running + queued jobs admitted to the pool
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._board = None
+        self._free = list(range(self.slots))
+        self._admission = asyncio.Semaphore(self.slots)
+        self._abandoned: Set[asyncio.Future] = set()
+        self.inline = 0
+        self.pooled = 0
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+    def start(self):
+        ctx = multiprocessing.get_context("spawn") # never fork a process with a running event loop
+        self._board = ctx.RawArray("b", self.slots)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self._board,)
+        )
+        # Spawn and warm the workers now instead of on the first large request
+        for _ in range(self.max_workers):
+            self._pool.submit(_warm)
+
+    def shutdown(self):
+        if self._pool is None:
+            return
+        for slot in range(self.slots):
+            self._board[slot] = 1
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any, cost: float = 0, **kwargs: Any) -> Any:
+        if cost <= self.inline_max_cost:
+            self.inline += 1
+            return fn(*args, **kwargs)
+        if self._pool is None:
+            # Pool disabled: still keep the loop free
+            self.pooled += 1
+            return await asyncio.wait_for(asyncio.to_thread(fn, *args, **kwargs), timeout=self.timeout)
+        return await self._submit(fn, args, kwargs)
+
+    async def _submit(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        deadline = time.time() + self.timeout
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._admission.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ExecutorBusyError(f"risk pool busy for {self.timeout}s")
+        finally:
+            self.waiting -= 1
+
+        slot = self._free.pop()
+        self._board[slot] = 0
+        pool = self._pool
+        try:
+            job = pool.submit(_run_job, slot, deadline, fn, args, kwargs)
+        except BrokenProcessPool:
+            self._release(slot)
+            self._restart(pool)
+            raise
+        future = asyncio.wrap_future(job)
+        future.add_done_callback(functools.partial(self._finished, slot))
+        self.pooled += 1
+        self.running += 1
+
+        try:
+            # The worker enforces the deadline at checkpoints; allow a moment for it to report
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=max(deadline - time.time(), 0) + 1.0)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            self._abandon(slot, job, future)
+            raise RiskJobTimeout("Risk computation exceeded its time limit")
+        except RiskJobTimeout:
+            self.timed_out += 1
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            self._abandon(slot, job, future)
+            raise
+        except BrokenProcessPool:
+            self._restart(pool)
+            raise
+        return _import(result)
+
+    def _abandon(self, slot: int, job, future: asyncio.Future):
+        if future.done():
+            # Finished before the caller gave up, so its slot may already be reused: only drop the result
+            self._discard(future)
+            return
+        # A queued job is dropped; a running one stops at its next checkpoint.
+        # Either way the slot is only reused once the worker is done with it.
+        self._abandoned.add(future)
+        self._board[slot] = 1
+        job.cancel()
+
+    def _finished(self, slot: int, future: asyncio.Future):
+        self.running -= 1
+        self.completed += 1
+        if future in self._abandoned:
+            self._abandoned.discard(future)
+            self._discard(future)
+        self._release(slot)
+
+    @staticmethod
+    def _discard(future: asyncio.Future):
+        # Unlink the shared memory of a result nobody will import
+        if not future.cancelled() and future.exception() is None:
+            _import(future.result(), keep=False)
+
+    def _release(self, slot: int):
+        self._free.append(slot)
+        self._admission.release()
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        if self._pool is not broken:
+            return # already replaced by another caller
+        print("Risk process pool broke; restarting")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers if self._pool is not None else 0,
+            "inline_max_cost": self.inline_max_cost,
+            "inline": self.inline,
+            "pooled": self.pooled,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected
+        }
+
+risk_executor = RiskExecutor()
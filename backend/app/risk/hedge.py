@@ -1,48 +1,103 @@
-from typing import List, Dict, Any
+import asyncio
+import numpy as np
+from typing import List, Dict, Any, Optional
+from app.config import get_settings
 from app.models import HedgeRecommendation, HedgeMarket, Market
+from app.polymarket.clob import ClobClient
+from app.risk.correlation import CorrelationCache
+
+settings = get_settings()
 
 class HedgeAnalyzer:
-    def suggest_hedges(
-        self, 
-        current_market: Market, 
-        position: Dict[str, float], 
-        related_markets: List[Market]
+    """
+    Minimum-variance hedges from observed price co-movement.
+
+    Hourly price histories of the event's markets are fetched concurrently
+    (from the on-disk store, so only deltas go upstream) and turned into a
+    correlation/covariance matrix that is cached per event and refreshed
+    incrementally. For a position of `shares` YES in market i, the
+    variance-minimising hedge in market j is `-shares * cov(i, j) / var(j)`
+    YES shares, which removes corr(i, j)^2 of the position's variance.
+    """
+    def __init__(self, clob: Optional[ClobClient] = None):
+        self.clob = clob or ClobClient()
+        self.correlations = CorrelationCache()
+
+    async def suggest_hedges(
+        self,
+        current_market: Market,
+        position: Dict[str, float],
+        related_markets: List[Market],
+        event_id: Optional[str] = None
     ) -> HedgeRecommendation:
         shares = position.get("shares", 0)
-        
+        caveats = [
+            f"Correlations are estimated from hourly price changes over the last {settings.HEDGE_LOOKBACK_DAYS} days and may not hold in a regime change.",
+            "Liquidity scores represent the depth of the hedge market.",
+            "Hedge suggestions do not account for individual risk tolerance."
+        ]
+
+        markets = {m.id: m for m in related_markets if m.clob_token_ids}
+        if current_market.clob_token_ids:
+            markets[current_market.id] = current_market
+        if current_market.id not in markets or len(markets) < 2:
+            return HedgeRecommendation(hedge_markets=[], caveats=["No related markets with price history to hedge with."] + caveats[1:])
+
+        if len(markets) > settings.HEDGE_MAX_MARKETS:
+            # Very large events: keep the most liquid candidates
+            ranked = sorted((m for m in markets.values() if m.id != current_market.id), key=lambda m: -m.liquidity)
+            markets = {m.id: m for m in ranked[:settings.HEDGE_MAX_MARKETS - 1]}
+            markets[current_market.id] = current_market
+
+        market_ids = sorted(markets)
+        entry, stale = self.correlations.get(event_id or current_market.group_id or current_market.id, market_ids)
+        if stale:
+            async with entry.lock:
+                # A concurrent request may have refreshed it while we waited
+                if entry.is_stale():
+                    by_token, missing = await self.clob.get_price_histories(
+                        [markets[m].clob_token_ids[0] for m in market_ids],
+                        "1h",
+                        settings.HEDGE_LOOKBACK_DAYS,
+                        concurrency=settings.HEDGE_FETCH_CONCURRENCY,
+                        timeout=settings.HEDGE_FETCH_BUDGET
+                    )
+                    histories = {m: by_token[markets[m].clob_token_ids[0]] for m in market_ids if markets[m].clob_token_ids[0] in by_token}
+                    if missing:
+                        caveats.append(f"{len(missing)} market histories were still loading and are excluded from this estimate.")
+                    await asyncio.to_thread(entry.refresh, histories)
+                    if missing:
+                        entry.invalidate()
+
+        corr, cov, var = entry.statistics()
+        i = entry.index[current_market.id]
+        prices = entry.latest_prices()
+
         hedge_markets = []
-        for rm in related_markets:
-            if rm.id == current_market.id:
+        for j, market_id in enumerate(entry.market_ids):
+            if j == i or np.isnan(corr[i, j]) or np.isnan(prices[j]):
                 continue
-                
-            # Heuristic for correlation proxy
-            # If they are in the same event, they are likely related
-            correlation = 0.7 if rm.group_id == current_market.group_id else 0.3
-            
-            # Liquidity score (0-1)
-            liquidity_score = min(rm.liquidity / 1000000, 1.0)
-            
-            # Suggested size (e.g. 20% of current position value)
-            current_value = shares * float(current_market.outcome_prices[0] if current_market.outcome_prices else 0.5)
-            suggested_size = current_value * correlation * 0.5
-            
+            market = markets[market_id]
+            # Minimum-variance hedge ratio: YES shares of j per YES share held in i
+            hedge_shares = -shares * cov[i, j] / var[i, j]
+            buy_yes = hedge_shares > 0
+            unit_price = prices[j] if buy_yes else 1.0 - prices[j]
+            side = "YES" if buy_yes else "NO"
+            r = float(corr[i, j])
+
             hedge_markets.append(HedgeMarket(
-                market_id=rm.id,
-                reason=f"High correlation proxy ({correlation}) due to shared event/category.",
-                correlation_proxy=correlation,
-                liquidity_score=round(liquidity_score, 2),
-                suggested_size=round(suggested_size, 2),
-                expected_downside_reduction=round(correlation * 0.4 * 100, 2)
+                market_id=market_id,
+                reason=f"Hourly price-change correlation {r:+.2f}; minimum-variance hedge is buying {abs(hedge_shares):.0f} {side} shares.",
+                correlation_proxy=round(r, 3),
+                liquidity_score=round(min(market.liquidity / 1000000, 1.0), 2),
+                suggested_size=round(float(abs(hedge_shares) * unit_price), 2),
+                expected_downside_reduction=round(r * r * 100, 2)
             ))
-            
-        # Sort by correlation and liquidity
-        hedge_markets.sort(key=lambda x: (x.correlation_proxy, x.liquidity_score), reverse=True)
-        
+
+        # Strongest co-movement first (either sign hedges), then liquidity
+        hedge_markets.sort(key=lambda x: (abs(x.correlation_proxy), x.liquidity_score), reverse=True)
+
         return HedgeRecommendation(
             hedge_markets=hedge_markets[:5],
-            caveats=[
-                "Correlation proxies are estimated based on metadata and category overlap.",
-                "Liquidity scores represent the depth of the hedge market.",
-                "Hedge suggestions do not account for individual risk tolerance."
-            ]
+            caveats=caveats
         )
@@ -1,70 +1,180 @@
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from app.config import get_settings
 from app.models import MonteCarloResult, TimeseriesPoint
+from app.risk.executor import checkpoint
+
+settings = get_settings()
+
+# Percentile bands reported to the fan chart
+BAND_QUANTILES = {
+    "p5": 0.05,
+    "p25": 0.25,
+    "p50": 0.50,
+    "p75": 0.75,
+    "p95": 0.95,
+}
 
 class MonteCarloSimulator:
+    def estimate_cost(self, horizon_days: int, n_paths: int) -> int:
+        return n_paths * (horizon_days + 1)
+
     def run_monte_carlo(
-        self, 
-        timeseries: List[TimeseriesPoint], 
-        horizon_days: int = 30, 
-        n_paths: int = 1000
+        self,
+        timeseries: List[TimeseriesPoint],
+        horizon_days: int = 30,
+        n_paths: int = 1000,
+        seed: Optional[int] = None,
+        precision: str = "float64",
+        method: str = "auto"
     ) -> MonteCarloResult:
         if len(timeseries) < 2:
             # Fallback if not enough data
             return self._mock_result(horizon_days, n_paths)
-            
-        prices = np.array([p.price for p in timeseries])
-        
-        # Calculate daily returns
+
+        dtype = np.float32 if precision == "float32" else np.float64
+        prices = np.array([p.price for p in timeseries], dtype=np.float64)
+        current_price, daily_vol = self._estimate_params(prices)
+
+        # Draw a seed up front so any run can be replayed exactly
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        rng = np.random.default_rng(seed)
+
+        # Runs above the threshold always stream: an explicit "exact" would need the dense path matrix
+        if method != "streaming":
+            cells = n_paths * (horizon_days + 1)
+            method = "streaming" if cells > settings.MC_STREAMING_THRESHOLD else "exact"
+
+        if method == "streaming":
+            bands, sample_paths = self._run_streaming(rng, current_price, daily_vol, horizon_days, n_paths, dtype)
+        else:
+            paths = self._simulate_paths(rng, current_price, daily_vol, horizon_days, n_paths, dtype)
+            bands = self._quantile_bands(paths)
+            sample_paths = paths[:, :5].T.tolist() # Return 5 sample paths for visualization
+
+        return MonteCarloResult(
+            horizon_days=horizon_days,
+            n_paths=n_paths,
+            bands=bands,
+            sample_paths=sample_paths,
+            seed=seed,
+            method=method
+        )
+
+    def _estimate_params(self, prices: np.ndarray):
         # Midpoint history is hourly, so we calculate hourly returns and scale
         returns = np.diff(prices) / prices[:-1]
-        
-        # Estimate daily volatility
+
         # Since history is hourly, hourly_vol * sqrt(24) = daily_vol
         hourly_vol = np.std(returns)
         daily_vol = hourly_vol * np.sqrt(24)
-        
-        # Current price
-        current_price = prices[-1]
-        
-        # Simulate paths using Geometric Brownian Motion (simplified for prediction markets)
-        # S_t = S_0 * exp((mu - 0.5 * sigma^2) * t + sigma * W_t)
+
+        return float(prices[-1]), float(daily_vol)
+
+    def _simulate_paths(
+        self,
+        rng: np.random.Generator,
+        current_price: float,
+        daily_vol: float,
+        horizon_days: int,
+        n_paths: int,
+        dtype=np.float64
+    ) -> np.ndarray:
+        # Geometric Brownian Motion in log space (simplified for prediction markets):
+        # log S_t = log S_0 + sum_{k<=t} ((mu - 0.5 * sigma^2) * dt + sigma * sqrt(dt) * z_k)
         # In prediction markets, mu is often assumed 0 or matches current price expectations
-        mu = 0 
+        mu = 0
         dt = 1 # day
-        
-        paths = np.zeros((n_paths, horizon_days + 1))
-        paths[:, 0] = current_price
-        
-        for t in range(1, horizon_days + 1):
-            z = np.random.standard_normal(n_paths)
-            paths[:, t] = paths[:, t-1] * np.exp((mu - 0.5 * daily_vol**2) * dt + daily_vol * np.sqrt(dt) * z)
-            
+
+        # Day-major layout (horizon_days + 1, n_paths) keeps every day contiguous
+        paths = np.empty((horizon_days + 1, n_paths), dtype=dtype)
+        paths[0] = np.log(current_price)
+
+        # All shocks in one draw, scaled and accumulated in place
+        shocks = paths[1:]
+        rng.standard_normal(out=shocks, dtype=dtype)
+        shocks *= daily_vol * np.sqrt(dt)
+        shocks += (mu - 0.5 * daily_vol**2) * dt
+        np.cumsum(paths, axis=0, out=paths)
+        np.exp(paths, out=paths)
+
         # Bound paths between 0 and 1
-        paths = np.clip(paths, 0.001, 0.999)
-        
-        # Calculate quantiles for each day
-        bands = {
-            "p5": np.percentile(paths, 5, axis=0).tolist(),
-            "p25": np.percentile(paths, 25, axis=0).tolist(),
-            "p50": np.percentile(paths, 50, axis=0).tolist(),
-            "p75": np.percentile(paths, 75, axis=0).tolist(),
-            "p95": np.percentile(paths, 95, axis=0).tolist(),
-        }
-        
-        return MonteCarloResult(
-            horizon_days=horizon_days,
-            n_paths=n_paths,
-            bands=bands,
-            sample_paths=paths[:5].tolist() # Return 5 sample paths for visualization
-        )
+        np.clip(paths, 0.001, 0.999, out=paths)
+        return paths
+
+    def _quantile_bands(self, paths: np.ndarray) -> Dict[str, List[float]]:
+        # A single partition pass selects every requested quantile at once
+        qs = np.fromiter(BAND_QUANTILES.values(), dtype=np.float64)
+        values = np.quantile(paths, qs, axis=1)
+        return {name: values[i].tolist() for i, name in enumerate(BAND_QUANTILES)}
+
+    def _run_streaming(
+        self,
+        rng: np.random.Generator,
+        current_price: float,
+        daily_vol: float,
+        horizon_days: int,
+        n_paths: int,
+        dtype=np.float64
+    ):
+        """
+        Constant-memory variant for very large runs. Paths are simulated in
+        blocks of MC_CHUNK_PATHS and folded into one fixed-bin histogram per day
+        over [0, 1] (prices are bounded), so peak memory is
+        O(horizon_days * MC_HISTOGRAM_BINS + horizon_days * MC_CHUNK_PATHS)
+        regardless of n_paths.
+
+        Bands are interpolated linearly inside a bin, so each value is within
+        one bin width (1 / MC_HISTOGRAM_BINS, ~0.00025 by default) of the exact
+        quantile of the same paths. Blocks draw from the same seeded Generator,
+        so a seed reproduces the streaming result, though not the exact one.
+        """
+        n_days = horizon_days + 1
+        n_bins = settings.MC_HISTOGRAM_BINS
+        counts = np.zeros(n_days * n_bins, dtype=np.int64)
+        day_offsets = (np.arange(n_days, dtype=np.intp) * n_bins)[:, None]
+        sample_paths = None
+
+        remaining = n_paths
+        while remaining > 0:
+            chunk = min(settings.MC_CHUNK_PATHS, remaining)
+            remaining -= chunk
+            checkpoint()
+
+            paths = self._simulate_paths(rng, current_price, daily_vol, horizon_days, chunk, dtype)
+            if sample_paths is None:
+                sample_paths = paths[:, :5].T.tolist()
+
+            bins = (paths * n_bins).astype(np.intp)
+            np.minimum(bins, n_bins - 1, out=bins)
+            bins += day_offsets
+            counts += np.bincount(bins.ravel(), minlength=n_days * n_bins)
+
+        counts = counts.reshape(n_days, n_bins)
+        return self._histogram_bands(counts, n_paths), sample_paths
+
+    def _histogram_bands(self, counts: np.ndarray, n_paths: int) -> Dict[str, List[float]]:
+        n_days, n_bins = counts.shape
+        cdf = np.cumsum(counts, axis=1)
+        rows = np.arange(n_days)
+
+        bands = {}
+        for name, q in BAND_QUANTILES.items():
+            # Same rank convention as np.quantile's default (linear) method
+            rank = q * (n_paths - 1) + 1
+            b = np.minimum((cdf < rank).sum(axis=1), n_bins - 1)
+            below = np.where(b > 0, cdf[rows, b - 1], 0)
+            frac = (rank - below) / np.maximum(counts[rows, b], 1)
+            bands[name] = ((b + np.clip(frac, 0.0, 1.0)) / n_bins).tolist()
+        return bands
 
     def _mock_result(self, horizon_days: int, n_paths: int) -> MonteCarloResult:
         # Fallback with some default volatility
         days = np.arange(horizon_days + 1)
         base = 0.5
         vol = 0.05
-        
+
         bands = {
             "p5": (base - 1.96 * vol * np.sqrt(days)).clip(0.01, 0.99).tolist(),
             "p25": (base - 0.67 * vol * np.sqrt(days)).clip(0.01, 0.99).tolist(),
@@ -72,7 +182,7 @@ class MonteCarloSimulator:
             "p75": (base + 0.67 * vol * np.sqrt(days)).clip(0.01, 0.99).tolist(),
             "p95": (base + 1.96 * vol * np.sqrt(days)).clip(0.01, 0.99).tolist(),
         }
-        
+
         return MonteCarloResult(
             horizon_days=horizon_days,
             n_paths=n_paths,
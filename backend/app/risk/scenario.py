@@ -1,8 +1,48 @@
 import numpy as np
-from typing import List, Dict, Any
-from app.models import ScenarioResult, Scenario, ScenarioPnl, MarketSnapshot
+from typing import List, Dict, Any, Optional
+from app.models import ScenarioResult, Scenario, ScenarioPnl, MarketSnapshot, ScenarioGridResult
+from app.risk.executor import risk_executor
+
+SLIDER_MODEL = {
+    "unit": "pct",
+    "min": -50,
+    "max": 50,
+    "step": 1
+}
+
+def slider_shocks() -> np.ndarray:
+    """Every shock the UI slider can select."""
+    return np.arange(SLIDER_MODEL["min"], SLIDER_MODEL["max"] + SLIDER_MODEL["step"], SLIDER_MODEL["step"], dtype=np.float64)
 
 class ScenarioAnalyzer:
+    def evaluate(
+        self,
+        base_prices: np.ndarray,
+        shares: np.ndarray,
+        avg_prices: np.ndarray,
+        shocks: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Broadcast positions (n,) against shocks (m,) in one pass.
+        Returns (n, m) projected prices and P&L deltas, and (n,) max loss/gain.
+        """
+        # shock is in percentage (e.g. -10, 20)
+        shock_factor = 1 + shocks / 100.0
+        # Bound price between 0 and 1 for prediction markets
+        projected = np.clip(base_prices[:, None] * shock_factor[None, :], 0.001, 0.999)
+        delta = shares[:, None] * (projected - base_prices[:, None])
+
+        # Max loss/gain relative to cost basis (a Yes position goes to 1 or 0)
+        long = shares > 0
+        max_gain = np.where(long, shares * (1.0 - avg_prices), 0.0)
+        max_loss = np.where(long, shares * (0.0 - avg_prices), 0.0)
+        return {
+            "projected_price": projected,
+            "pnl": delta,
+            "max_loss": max_loss,
+            "max_gain": max_gain
+        }
+
     def compute_scenarios(
         self, 
         snapshot: MarketSnapshot, 
@@ -12,47 +52,68 @@ class ScenarioAnalyzer:
         base_price = snapshot.price
         shares = position.get("shares", 0)
         avg_price = position.get("avg_price", base_price)
-        
-        scenarios = []
-        for shock in shocks:
-            # shock is in percentage (e.g. -10, 20)
-            shock_factor = 1 + (shock / 100.0)
-            projected_price = base_price * shock_factor
-            
-            # Bound price between 0 and 1 for prediction markets
-            projected_price = max(0.001, min(0.999, projected_price))
-            
-            # P&L Calculation
-            # Position Value = shares * price
-            current_value = shares * base_price
-            projected_value = shares * projected_price
-            delta = projected_value - current_value
-            
-            # Max loss/gain relative to cost basis
-            # For a Yes position:
-            # Max gain is if price goes to 1
-            # Max loss is if price goes to 0
-            max_gain = shares * (1.0 - avg_price) if shares > 0 else 0
-            max_loss = shares * (0.0 - avg_price) if shares > 0 else 0
-            
-            scenarios.append(Scenario(
+
+        grid = self.evaluate(
+            np.array([base_price], dtype=np.float64),
+            np.array([shares], dtype=np.float64),
+            np.array([avg_price], dtype=np.float64),
+            np.asarray(shocks, dtype=np.float64)
+        )
+        projected = np.round(grid["projected_price"][0], 4).tolist()
+        deltas = np.round(grid["pnl"][0], 2).tolist()
+        max_loss = round(float(grid["max_loss"][0]), 2)
+        max_gain = round(float(grid["max_gain"][0]), 2)
+
+        scenarios = [
+            Scenario(
                 name=f"{shock}% Shock",
                 shock_pct=shock,
-                projected_price=round(projected_price, 4),
+                projected_price=projected[k],
                 pnl=ScenarioPnl(
-                    position_value_delta=round(delta, 2),
-                    max_loss=round(max_loss, 2),
-                    max_gain=round(max_gain, 2)
+                    position_value_delta=deltas[k],
+                    max_loss=max_loss,
+                    max_gain=max_gain
                 )
-            ))
-            
+            )
+            for k, shock in enumerate(shocks)
+        ]
+
         return ScenarioResult(
             base_price=base_price,
             scenarios=scenarios,
-            slider_model={
-                "unit": "pct",
-                "min": -50,
-                "max": 50,
-                "step": 1
-            }
+            slider_model=dict(SLIDER_MODEL)
+        )
+
+    async def compute_grid(
+        self,
+        market_ids: List[str],
+        base_prices: List[float],
+        shares: List[float],
+        avg_prices: List[Optional[float]],
+        shocks: Optional[List[float]] = None,
+        missing: Optional[Dict[str, str]] = None
+    ) -> ScenarioGridResult:
+        """
+        Columnar scenario grid: row i of every matrix is position i, column k
+        is shocks[k], so the UI can interpolate any slider value locally.
+        """
+        shock_grid = slider_shocks() if shocks is None else np.asarray(shocks, dtype=np.float64)
+        base = np.asarray(base_prices, dtype=np.float64)
+        avg = np.array([b if a is None else a for a, b in zip(avg_prices, base_prices)], dtype=np.float64)
+        held = np.asarray(shares, dtype=np.float64)
+
+        grid = await risk_executor.run(self.evaluate, base, held, avg, shock_grid, cost=len(base) * len(shock_grid))
+        pnl = grid["pnl"]
+        # Every field is built from float arrays here; skip re-validating ~100k list items
+        return ScenarioGridResult.model_construct(
+            shocks=shock_grid.tolist(),
+            market_ids=market_ids,
+            base_prices=base.tolist(),
+            projected_prices=np.round(grid["projected_price"], 4).tolist(),
+            pnl=np.round(pnl, 2).tolist(),
+            total_pnl=np.round(pnl.sum(axis=0), 2).tolist(),
+            max_loss=np.round(grid["max_loss"], 2).tolist(),
+            max_gain=np.round(grid["max_gain"], 2).tolist(),
+            slider_model=dict(SLIDER_MODEL),
+            errors=missing or {}
         )
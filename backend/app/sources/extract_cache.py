@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from app.config import get_settings
+from app.sources.tavily_client import TavilySource
+from app.storage.state import storage
+
+settings = get_settings()
+
+# Query parameters that only track the click, not the content
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "cmpid", "ocid"}
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.endswith(":80") and parts.scheme == "http":
+        netloc = netloc[:-3]
+    elif netloc.endswith(":443") and parts.scheme == "https":
+        netloc = netloc[:-4]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), netloc, path, urlencode(query), ""))
+
+class ExtractionCache:
+    """
+    Per-URL extraction cache in front of `TavilySource.extract`.
+
+    Results are stored by normalized URL for EXTRACT_CACHE_TTL. Misses from
+    every concurrent caller (i.e. all analyses running at once) are collected
+    for EXTRACT_BATCH_WINDOW seconds and sent as shared `extract` batches of
+    at most EXTRACT_BATCH_SIZE URLs; a URL already pending in a batch is
+    awaited, not requested again.
+    """
+    def __init__(self, source: TavilySource):
+        self.source = source
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._batch: List[Tuple[str, str]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    def _key(self, normalized: str) -> str:
+        return f"extract:{hashlib.sha1(normalized.encode()).hexdigest()}"
+
+    async def extract(self, urls: List[str]) -> List[Dict[str, Any]]:
+        normalized = list(dict.fromkeys(normalize_url(u) for u in urls))
+        originals = {normalize_url(u): u for u in reversed(urls)}
+
+        futures: Dict[str, asyncio.Future] = {}
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        cached_items = await storage.mget([self._key(norm) for norm in normalized])
+        for norm, cached in zip(normalized, cached_items):
+            if cached is not None:
+                self.hits += 1
+                results[norm] = cached
+                continue
+            self.misses += 1
+            futures[norm] = self._schedule(norm, originals[norm])
+
+        if futures:
+            resolved = await asyncio.gather(*(asyncio.shield(f) for f in futures.values()), return_exceptions=True)
+            for norm, value in zip(futures, resolved):
+                if isinstance(value, Exception):
+                    print(f"Extraction failed for {norm}: {str(value)}")
+                    continue
+                results[norm] = value
+
+        # Same shape as TavilySource.extract: successful extractions only, in request order
+        return [results[n] for n in normalized if results.get(n)]
+
+    def _schedule(self, norm: str, url: str) -> asyncio.Future:
+        future = self._pending.get(norm)
+        if future is not None:
+            return future
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[norm] = future
+        self._batch.append((norm, url))
+
+        if len(self._batch) >= settings.EXTRACT_BATCH_SIZE:
+            self._spawn(self._flush())
+        elif self._flush_task is None:
+            self._flush_task = self._spawn(self._flush_later())
+        return future
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_later(self):
+        await asyncio.sleep(settings.EXTRACT_BATCH_WINDOW)
+        self._flush_task = None
+        while self._batch:
+            await self._flush()
+
+    async def _flush(self):
+        batch = self._batch[:settings.EXTRACT_BATCH_SIZE]
+        self._batch = self._batch[settings.EXTRACT_BATCH_SIZE:]
+        if not batch:
+            return
+
+        self.batches += 1
+        try:
+            extracted = await self.source.extract([url for _, url in batch])
+        except BaseException as e:
+            for norm, _ in batch:
+                future = self._pending.pop(norm, None)
+                if future and not future.done():
+                    if isinstance(e, Exception):
+                        future.set_exception(e)
+                    else:
+                        future.cancel()
+            if isinstance(e, Exception):
+                return
+            raise
+
+        by_url = {}
+        try:
+            by_url = {normalize_url(item["url"]): item for item in extracted if item.get("url")}
+        finally:
+            # Waiters are released even if the response is malformed; missing URLs resolve to None
+            for norm, _ in batch:
+                future = self._pending.pop(norm, None)
+                if future and not future.done():
+                    future.set_result(by_url.get(norm))
+
+        # Best effort: a storage failure only costs a later re-extraction
+        try:
+            await storage.mset(
+                {self._key(norm): by_url[norm] for norm, _ in batch if norm in by_url},
+                expire=settings.EXTRACT_CACHE_TTL
+            )
+        except Exception as e:
+            print(f"Extraction cache write failed: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "pending": len(self._pending)
+        }
@@ -1,6 +1,7 @@
 import praw
 from typing import List, Dict, Any
 from app.config import get_settings
+from app.executors import reddit_executor
 import asyncio
 
 settings = get_settings()
@@ -35,11 +36,12 @@ class RedditSource:
                     "score": sub.score,
                     "num_comments": sub.num_comments,
                     "created_utc": sub.created_utc,
-                    "subreddit": sub.subreddit.display_name
+                    # str() uses the name from the listing; .display_name would lazily fetch the subreddit
+                    "subreddit": str(sub.subreddit)
                 })
             return results
             
-        return await asyncio.to_thread(_search)
+        return await reddit_executor.run(_search)
 
     async def get_comments(self, submission_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         if not self.reddit:
@@ -60,4 +62,24 @@ class RedditSource:
                 })
             return comments
             
-        return await asyncio.to_thread(_get_comments)
+        return await reddit_executor.run(_get_comments)
+
+    async def fetch_threads(self, query: str, limit: int = 10, comments_per_thread: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search submissions and attach each one's top comments. Comment fetches
+        run concurrently, at most REDDIT_COMMENT_FANOUT at a time per call so a
+        single analysis cannot occupy the whole Reddit pool.
+        """
+        submissions = await self.search_submissions(query, limit=limit)
+        fanout = asyncio.Semaphore(settings.REDDIT_COMMENT_FANOUT)
+
+        async def attach_comments(sub: Dict[str, Any]) -> Dict[str, Any]:
+            async with fanout:
+                try:
+                    comments = await self.get_comments(sub["id"], limit=comments_per_thread)
+                except Exception as e:
+                    print(f"Reddit comments error for {sub['id']}: {str(e)}")
+                    comments = []
+            return {**sub, "comments": comments}
+
+        return await asyncio.gather(*(attach_comments(sub) for sub in submissions))
@@ -1,6 +1,7 @@
 from tavily import TavilyClient
 from typing import List, Dict, Any
 from app.config import get_settings
+from app.executors import tavily_executor
 
 settings = get_settings()
 
@@ -11,11 +12,9 @@ class TavilySource:
         self.client = TavilyClient(api_key=settings.TAVILY_API_KEY)
 
     async def search(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
-        # tavily-python is synchronous, but we can wrap it or just call it if needed.
-        # For a hackathon, we can use it as is or use asyncio.to_thread
-        import asyncio
-        response = await asyncio.to_thread(
-            self.client.search, 
+        # tavily-python is synchronous; run it on the Tavily pool
+        response = await tavily_executor.run(
+            self.client.search,
             query=query, 
             search_depth="advanced", 
             max_results=max_results
@@ -23,9 +22,8 @@ class TavilySource:
         return response.get("results", [])
 
     async def extract(self, urls: List[str]) -> List[Dict[str, Any]]:
-        import asyncio
         # tavily-python extract
-        response = await asyncio.to_thread(
+        response = await tavily_executor.run(
             self.client.extract,
             urls=urls
         )
@@ -0,0 +1,80 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+from app.storage.state import storage
+
+CHANNEL_PREFIX = "analysis:events:"
+
+class ProgressBus:
+    """
+    Fan-out of analysis progress events to streaming subscribers.
+
+    With Redis, events are PUBLISHed on `analysis:events:<id>` and every
+    worker process runs one pattern subscription that delivers them to its
+    local subscribers, so a client can stream from any worker. Without
+    Redis, events are delivered in-process directly.
+    """
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        pubsub = storage.pubsub()
+        if pubsub is None or self._listener is not None:
+            return
+        await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def publish(self, analysis_id: str, event: Dict[str, Any]):
+        if self._listener is not None:
+            await storage.publish(f"{CHANNEL_PREFIX}{analysis_id}", event)
+        else:
+            self._deliver(analysis_id, event)
+
+    @asynccontextmanager
+    async def subscribe(self, analysis_id: str) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(analysis_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(analysis_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[analysis_id]
+
+    def _deliver(self, analysis_id: str, event: Dict[str, Any]):
+        for queue in self._subscribers.get(analysis_id, ()):
+            queue.put_nowait(event)
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
+                try:
+                    async for message in pubsub.listen():
+                        if message.get("type") != "pmessage":
+                            continue
+                        analysis_id = message["channel"][len(CHANNEL_PREFIX):]
+                        if analysis_id in self._subscribers:
+                            self._deliver(analysis_id, json.loads(message["data"]))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Progress bus listener error: {str(e)}")
+                    await asyncio.sleep(1.0)
+        finally:
+            await pubsub.aclose()
+
+# Singleton instance
+progress_bus = ProgressBus()
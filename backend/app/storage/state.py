@@ -1,35 +1,208 @@
 import json
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional
 from app.config import get_settings
-import redis
+from app.storage.cache import TTLCache
+import redis.asyncio as aioredis
 
 settings = get_settings()
 
 class Storage:
+    """
+    Async key/value and hash storage. Backed by a pooled `redis.asyncio`
+    client once `connect()` succeeds (called from the app lifespan), and by
+    in-process dicts otherwise. In memory, JSON values honour their `expire`
+    through a bounded TTLCache, and hashes and sorted sets through per-key
+    deadlines, like Redis keys would.
+    """
     def __init__(self):
         self.use_redis = False
+        self.redis: Optional[aioredis.Redis] = None
+        self.memory = TTLCache(maxsize=settings.MEMORY_STORE_MAX_KEYS, ttl=3600)
+        self.hashes: Dict[str, Dict[str, str]] = {}
+        self.zsets: Dict[str, Dict[str, float]] = {}
+        self.deadlines: Dict[str, float] = {} # monotonic expiry of in-memory hashes and sorted sets
+        self._next_sweep = 0.0
+
+    async def connect(self):
         try:
-            self.redis = redis.from_url(settings.REDIS_URL)
-            self.redis.ping()
+            pool = aioredis.ConnectionPool.from_url(
+                settings.REDIS_URL,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                decode_responses=True
+            )
+            self.redis = aioredis.Redis(connection_pool=pool)
+            await self.redis.ping()
             self.use_redis = True
         except Exception as e:
             print(f"Redis not available, using in-memory storage: {str(e)}")
-            self.memory: Dict[str, str] = {}
+            if self.redis is not None:
+                await self.redis.aclose(close_connection_pool=True)
+            self.redis = None
+            self.use_redis = False
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose(close_connection_pool=True)
+            self.redis = None
+            self.use_redis = False
+
+    # --- JSON values ---
 
-    def set(self, key: str, value: Any, expire: int = 3600):
+    async def set(self, key: str, value: Any, expire: int = 3600):
         val_str = json.dumps(value)
         if self.use_redis:
-            self.redis.setex(key, expire, val_str)
+            await self.redis.setex(key, expire, val_str)
+        else:
+            self.memory.set(key, val_str, ttl=expire)
+
+    async def mset(self, mapping: Dict[str, Any], expire: int = 3600):
+        """Set several values with one TTL in one pipelined round trip."""
+        if not mapping:
+            return
+        if self.use_redis:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.setex(key, expire, json.dumps(value))
+                await pipe.execute()
         else:
-            self.memory[key] = val_str
+            for key, value in mapping.items():
+                self.memory.set(key, json.dumps(value), ttl=expire)
 
-    def get(self, key: str) -> Optional[Any]:
+    async def get(self, key: str) -> Optional[Any]:
         if self.use_redis:
-            val = self.redis.get(key)
-            return json.loads(val) if val else None
+            val = await self.redis.get(key)
         else:
             val = self.memory.get(key)
-            return json.loads(val) if val else None
+        return json.loads(val) if val else None
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Several values in one round trip; None for missing keys."""
+        if not keys:
+            return []
+        if self.use_redis:
+            vals = await self.redis.mget(keys)
+        else:
+            vals = [self.memory.get(key) for key in keys]
+        return [json.loads(val) if val else None for val in vals]
+
+    async def set_nx(self, key: str, value: Any, expire: int = 3600) -> bool:
+        """Set only if absent; returns whether this caller won the key."""
+        val_str = json.dumps(value)
+        if self.use_redis:
+            return bool(await self.redis.set(key, val_str, ex=expire, nx=True))
+        if self.memory.get(key) is not None:
+            return False
+        self.memory.set(key, val_str, ttl=expire)
+        return True
+
+    async def expire(self, keys: List[str], expire: int):
+        """Reset the TTL of existing keys (one pipelined round trip)."""
+        if self.use_redis:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.expire(key, expire)
+                await pipe.execute()
+        else:
+            for key in keys:
+                value = self.memory.get(key)
+                if value is not None:
+                    self.memory.set(key, value, ttl=expire)
+                elif self._live(self.hashes, key) is not None or self._live(self.zsets, key) is not None:
+                    self._expire_at(key, expire)
+
+    async def delete(self, *keys: str):
+        if self.use_redis:
+            await self.redis.delete(*keys)
+        else:
+            for key in keys:
+                self.memory.invalidate(key)
+                self.hashes.pop(key, None)
+                self.zsets.pop(key, None)
+                self.deadlines.pop(key, None)
+
+    # --- In-memory expiry of hashes and sorted sets ---
+
+    def _live(self, store: Dict[str, Any], key: str) -> Optional[Any]:
+        deadline = self.deadlines.get(key)
+        if deadline is not None and deadline < time.monotonic():
+            self.hashes.pop(key, None)
+            self.zsets.pop(key, None)
+            del self.deadlines[key]
+            return None
+        return store.get(key)
+
+    def _expire_at(self, key: str, expire: Optional[int]):
+        if expire:
+            self.deadlines[key] = time.monotonic() + expire
+        # Keys that expire without being read again are dropped by a periodic sweep
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._next_sweep = now + 60
+            for stale in [k for k, deadline in self.deadlines.items() if deadline < now]:
+                self.hashes.pop(stale, None)
+                self.zsets.pop(stale, None)
+                del self.deadlines[stale]
+
+    # --- Hashes ---
+
+    async def hset(self, key: str, mapping: Dict[str, str], expire: Optional[int] = 3600):
+        """Set several hash fields in one atomic round trip (HSET + EXPIRE in a MULTI)."""
+        if self.use_redis:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=mapping)
+                if expire:
+                    pipe.expire(key, expire)
+                await pipe.execute()
+        else:
+            if self._live(self.hashes, key) is None:
+                self.hashes[key] = {}
+            self.hashes[key].update(mapping)
+            self._expire_at(key, expire)
+
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        if self.use_redis:
+            return await self.redis.hgetall(key)
+        return dict(self._live(self.hashes, key) or {})
+
+    # --- Sorted sets ---
+
+    async def zadd(self, key: str, mapping: Dict[str, float], expire: Optional[int] = None):
+        if self.use_redis:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zadd(key, mapping)
+                if expire:
+                    pipe.expire(key, expire)
+                await pipe.execute()
+        else:
+            if self._live(self.zsets, key) is None:
+                self.zsets[key] = {}
+            self.zsets[key].update(mapping)
+            self._expire_at(key, expire)
+
+    async def zrem(self, key: str, *members: str):
+        if self.use_redis:
+            await self.redis.zrem(key, *members)
+        else:
+            zset = self._live(self.zsets, key) or {}
+            for member in members:
+                zset.pop(member, None)
+
+    async def zrange(self, key: str) -> List[str]:
+        """All members, lowest score first."""
+        if self.use_redis:
+            return await self.redis.zrange(key, 0, -1)
+        zset = self._live(self.zsets, key) or {}
+        return sorted(zset, key=zset.get)
+
+    # --- Pub/sub ---
+
+    async def publish(self, channel: str, message: Any):
+        if self.use_redis:
+            await self.redis.publish(channel, json.dumps(message))
+
+    def pubsub(self) -> Optional[Any]:
+        return self.redis.pubsub() if self.use_redis else None
 
 # Singleton instance
 storage = Storage()
@@ -0,0 +1,187 @@
+import fcntl
+import json
+import os
+import re
+import shutil
+import time
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from app.config import get_settings
+
+settings = get_settings()
+
+TS_DTYPE = np.int64
+PX_DTYPE = np.float32
+
+# Relative PRICE_HISTORY_DIR values resolve against the backend directory, not the CWD
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+class PriceHistoryStore:
+    """
+    Append-only columnar price history per (token, fidelity): a version
+    directory holding `ts` (int64 epoch seconds) and `px` (float32 prices),
+    published through a `<key>` symlink. Files are memory-mapped for reads
+    and appended under an flock, so several worker processes can share one
+    root directory.
+
+    Appends write prices before timestamps and readers take the shorter of
+    the two, so a reader never sees a timestamp without its price. Rewrites
+    build a new version directory and swap the symlink in one rename, so a
+    reader sees either the old pair of columns or the new one, never a mix.
+    """
+    def __init__(self, root: Optional[str] = None):
+        root = Path(root or settings.PRICE_HISTORY_DIR)
+        self.root = root if root.is_absolute() else BACKEND_DIR / root
+        self._maps: Dict[str, Tuple[Tuple[str, int], np.ndarray, np.ndarray]] = {}
+
+    def open(self):
+        """Create the root directory; called from the app lifespan."""
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _base(self, token_id: str, fidelity: int) -> Path:
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", token_id)
+        return self.root / f"{safe}.{fidelity}"
+
+    @contextmanager
+    def _lock(self, base: Path):
+        with open(f"{base}.lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _version(self, base: Path) -> Optional[str]:
+        """Name of the version directory the `<key>` symlink points at."""
+        try:
+            return os.readlink(base)
+        except FileNotFoundError:
+            return None
+
+    def _publish(self, base: Path, ts: np.ndarray, px: np.ndarray) -> str:
+        """Write a new version directory and point the symlink at it; returns the old version."""
+        version = f"{base.name}.v{time.time_ns()}"
+        directory = self.root / version
+        directory.mkdir()
+        for name, arr, dtype in (("px", px, PX_DTYPE), ("ts", ts, TS_DTYPE)):
+            with open(directory / name, "wb") as f:
+                f.write(np.ascontiguousarray(arr, dtype=dtype).tobytes())
+        previous = self._version(base)
+        tmp = f"{base}.{os.getpid()}.tmp"
+        os.symlink(version, tmp)
+        os.replace(tmp, base)
+        return previous
+
+    # --- Metadata ---
+
+    def meta(self, token_id: str, fidelity: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(f"{self._base(token_id, fidelity)}.meta") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self, base: Path, meta: Dict[str, Any]):
+        tmp = f"{base}.meta.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, f"{base}.meta")
+
+    # --- Reads ---
+
+    def read(self, token_id: str, fidelity: int) -> Tuple[np.ndarray, np.ndarray]:
+        base = self._base(token_id, fidelity)
+        # A rewrite may remove the version just resolved; the retry follows the new symlink
+        for _ in range(3):
+            try:
+                return self._read_version(base)
+            except FileNotFoundError:
+                continue
+        return np.empty(0, dtype=TS_DTYPE), np.empty(0, dtype=PX_DTYPE)
+
+    def _read_version(self, base: Path) -> Tuple[np.ndarray, np.ndarray]:
+        version = self._version(base)
+        if version is None:
+            return np.empty(0, dtype=TS_DTYPE), np.empty(0, dtype=PX_DTYPE)
+        directory = self.root / version
+        n = min(
+            os.stat(directory / "ts").st_size // np.dtype(TS_DTYPE).itemsize,
+            os.stat(directory / "px").st_size // np.dtype(PX_DTYPE).itemsize
+        )
+        if n == 0:
+            return np.empty(0, dtype=TS_DTYPE), np.empty(0, dtype=PX_DTYPE)
+
+        # Re-map only when the columns have grown or been replaced since the last read
+        key = str(base)
+        cached = self._maps.get(key)
+        if cached and cached[0] == (version, n):
+            return cached[1], cached[2]
+        ts = np.memmap(directory / "ts", dtype=TS_DTYPE, mode="r", shape=(n,))
+        px = np.memmap(directory / "px", dtype=PX_DTYPE, mode="r", shape=(n,))
+        self._maps[key] = ((version, n), ts, px)
+        return ts, px
+
+    def window(
+        self,
+        token_id: str,
+        fidelity: int,
+        start_ts: int,
+        end_ts: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        ts, px = self.read(token_id, fidelity)
+        lo = np.searchsorted(ts, start_ts, side="left")
+        hi = len(ts) if end_ts is None else np.searchsorted(ts, end_ts, side="right")
+        return ts[lo:hi], px[lo:hi]
+
+    def last_timestamp(self, token_id: str, fidelity: int) -> Optional[int]:
+        ts, _ = self.read(token_id, fidelity)
+        return int(ts[-1]) if len(ts) else None
+
+    # --- Writes ---
+
+    def append(self, token_id: str, fidelity: int, ts: np.ndarray, px: np.ndarray):
+        base = self._base(token_id, fidelity)
+        with self._lock(base):
+            last = self.last_timestamp(token_id, fidelity)
+            if last is not None:
+                keep = ts > last
+                ts, px = ts[keep], px[keep]
+            version = self._version(base)
+            if version is None:
+                self._publish(base, ts, px)
+            elif len(ts):
+                directory = self.root / version
+                self._align(directory)
+                with open(directory / "px", "ab") as f:
+                    f.write(np.ascontiguousarray(px, dtype=PX_DTYPE).tobytes())
+                with open(directory / "ts", "ab") as f:
+                    f.write(np.ascontiguousarray(ts, dtype=TS_DTYPE).tobytes())
+
+            meta = self.meta(token_id, fidelity) or {}
+            meta["fetched_at"] = time.time()
+            self._write_meta(base, meta)
+
+    def _align(self, directory: Path):
+        # A writer that died between the two appends leaves extra prices; drop them before appending more
+        n = min(
+            os.stat(directory / "ts").st_size // np.dtype(TS_DTYPE).itemsize,
+            os.stat(directory / "px").st_size // np.dtype(PX_DTYPE).itemsize
+        )
+        os.truncate(directory / "ts", n * np.dtype(TS_DTYPE).itemsize)
+        os.truncate(directory / "px", n * np.dtype(PX_DTYPE).itemsize)
+
+    def replace(self, token_id: str, fidelity: int, ts: np.ndarray, px: np.ndarray, start_ts: int):
+        """Rewrite a token's history, e.g. to backfill a longer lookback than stored."""
+        base = self._base(token_id, fidelity)
+        with self._lock(base):
+            previous = self._publish(base, ts, px)
+            self._maps.pop(str(base), None)
+            self._write_meta(base, {"fetched_at": time.time(), "start_ts": int(start_ts)})
+            if previous is not None:
+                # Readers that already mapped the old columns keep them until they re-read
+                shutil.rmtree(self.root / previous, ignore_errors=True)
+
+# Singleton instance
+price_history = PriceHistoryStore()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make `app` importable when pytest is run from the backend directory or the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
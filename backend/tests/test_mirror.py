@@ -0,0 +1,60 @@
+import asyncio
+import time
+from app.polymarket.mirror import BookMirror
+from app.polymarket.mirror_stub import StubMarketServer
+
+TOKEN = "token-1"
+
+async def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+async def _mirror_against_stub(scenario):
+    server = StubMarketServer()
+    server.set_book(TOKEN, bids=[[0.48, 100.0], [0.47, 200.0]], asks=[[0.52, 150.0], [0.53, 250.0]])
+    await server.start()
+    mirror = BookMirror(url=server.url)
+    mirror.watch(TOKEN)
+    await mirror.start()
+    try:
+        await _wait_for(lambda: mirror.is_fresh(TOKEN))
+        await scenario(server, mirror)
+    finally:
+        await mirror.close()
+        await server.close()
+
+def test_snapshot():
+    async def scenario(server, mirror):
+        book = mirror.get_book(TOKEN)
+        assert book.best_bid == 0.48
+        assert book.best_ask == 0.52
+        assert mirror.books[TOKEN].bids == {0.48: 100.0, 0.47: 200.0}
+        assert mirror.books[TOKEN].asks == {0.52: 150.0, 0.53: 250.0}
+
+    asyncio.run(_mirror_against_stub(scenario))
+
+def test_delta():
+    async def scenario(server, mirror):
+        await server.publish_change(TOKEN, "BUY", 0.49, 50.0)
+        await server.publish_change(TOKEN, "SELL", 0.52, 0.0)
+        await _wait_for(lambda: mirror.books[TOKEN].seq == 2)
+        book = mirror.get_book(TOKEN)
+        assert book.best_bid == 0.49
+        assert book.best_ask == 0.53
+        assert mirror.resyncs == 0
+
+    asyncio.run(_mirror_against_stub(scenario))
+
+def test_sequence_gap_resyncs():
+    async def scenario(server, mirror):
+        await server.publish_change(TOKEN, "BUY", 0.49, 50.0, skip_seq=True)
+        await _wait_for(lambda: mirror.resyncs == 1)
+        # The re-subscribe brings a fresh snapshot that includes the change behind the gap
+        await _wait_for(lambda: mirror.is_fresh(TOKEN))
+        assert mirror.books[TOKEN].seq == server.seq[TOKEN]
+        assert mirror.get_book(TOKEN).best_bid == 0.49
+
+    asyncio.run(_mirror_against_stub(scenario))